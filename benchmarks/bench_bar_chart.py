@@ -0,0 +1,89 @@
+# Benchmark: Balkendiagramm "Expenses per project" im Insights-Tab
+# Vergleicht die frühere Variante (vier Traces pro Projekt, Lookups per Maske) mit charts.expenses_per_project_chart()
+# (vier Traces insgesamt): Zeit für den Aufbau der Figure und Grösse des serialisierten JSON, das an den Browser geht.
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_bar_chart
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from charts import expenses_per_project_chart
+
+
+# Synthetische Projekt-Zusammenfassung, wie sie insights.project_summary() liefert
+def make_summary(n_projects):
+    rng = np.random.default_rng(0)
+    exact_amount = rng.random(n_projects) * 5000
+    summary = pd.DataFrame({
+        "project": [f"Project {i}" for i in range(n_projects)],
+        "exact_amount": exact_amount,
+        "estimated": rng.random(n_projects) * 2000,
+        "conservative": rng.random(n_projects) * 3000,
+        "worst_case": rng.random(n_projects) * 4000,
+    })
+    for col in ("estimated", "conservative", "worst_case"):
+        summary[f"{col}_complete"] = exact_amount + summary[col]
+    return summary
+
+
+# Frühere Variante aus board.py: pro Projekt vier Lookups und vier go.Bar-Traces
+def legacy_chart(summary, show_sum=True):
+    grouped_df = summary[["project", "exact_amount", "estimated", "conservative", "worst_case"]].copy()
+    total_exact_amount = grouped_df['exact_amount'].sum()
+    total_estimated = grouped_df['estimated'].sum()
+    total_conservative = grouped_df['conservative'].sum()
+    total_worst_case = grouped_df['worst_case'].sum()
+    grouped_df['total_sum'] = grouped_df['exact_amount'] + grouped_df['worst_case']
+    grouped_df = grouped_df.sort_values(by='total_sum', ascending=True)
+
+    fig = go.Figure()
+    for project in grouped_df['project']:
+        sum_exact_amount = grouped_df.loc[grouped_df['project'] == project, 'exact_amount'].values[0]
+        sum_estimated = grouped_df.loc[grouped_df['project'] == project, 'estimated'].values[0]
+        sum_conservative = grouped_df.loc[grouped_df['project'] == project, 'conservative'].values[0]
+        sum_worst_case = grouped_df.loc[grouped_df['project'] == project, 'worst_case'].values[0]
+        for x, name, color in (
+            (sum_exact_amount + sum_worst_case, 'Worst Case', '#FFB3B3'),
+            (sum_exact_amount + sum_conservative, 'Conservative', '#FFD1A9'),
+            (sum_exact_amount + sum_estimated, 'Estimated', '#FDE780'),
+            (sum_exact_amount, 'Exact', '#AAD4F4'),
+        ):
+            fig.add_trace(go.Bar(x=[x], y=[project], orientation='h', name=f'{project} - {name}',
+                                 marker=dict(color=color), showlegend=False, hoverinfo="x"))
+    if show_sum:
+        for x, name, color in (
+            (total_exact_amount + total_worst_case, 'Worst Case', '#FFB3B3'),
+            (total_exact_amount + total_conservative, 'Conservative', '#FFD1A9'),
+            (total_exact_amount + total_estimated, 'Estimated', '#FDE780'),
+            (total_exact_amount, 'Exact', '#AAD4F4'),
+        ):
+            fig.add_trace(go.Bar(x=[x], y=["Total Expenses"], orientation='h', name=f'Total - {name}',
+                                 marker=dict(color=color), showlegend=True, hoverinfo="x"))
+    fig.update_layout(xaxis_title="CHF", yaxis=dict(showticklabels=True), barmode='overlay', height=600,
+                      margin=dict(l=10, r=10, t=10, b=10))
+    return fig
+
+
+# Bester Wert aus mehreren Durchläufen (Aufbau der Figure) und Grösse des JSON
+def measure(function, summary, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = function(summary, True)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(fig.to_json())
+
+
+def main():
+    print(f"{'projects':>8} {'legacy [ms]':>12} {'legacy [kB]':>12} {'4 traces [ms]':>14} {'4 traces [kB]':>14}")
+    for n_projects in (12, 50, 200, 1_000):
+        summary = make_summary(n_projects)
+        legacy_time, legacy_size = measure(legacy_chart, summary)
+        new_time, new_size = measure(expenses_per_project_chart, summary)
+        print(f"{n_projects:>8} {legacy_time * 1000:>12.1f} {legacy_size / 1024:>12.1f} "
+              f"{new_time * 1000:>14.1f} {new_size / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
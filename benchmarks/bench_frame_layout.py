@@ -0,0 +1,92 @@
+# Benchmark: Speicherbedarf und Laufzeiten des Expense-DataFrames
+# Vergleicht das frühere Layout (Texte als object, Priorität Int64, Datum als String) mit dem kompakten Layout
+# aus expenses.items_to_dataframe() (Categoricals, Datum zusätzlich als datetime64 mit Flags, Priorität Int8).
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_frame_layout
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("AWS_REGION", "eu-central-1")
+
+from expenses import PROJECTS, STATUSES, items_to_dataframe, readable_frame
+
+
+# Synthetische Items mit gleichmässig verteilten Projekten, Status und Datumsklassen
+def make_items(n):
+    rng = np.random.default_rng(0)
+    days = rng.integers(0, 730, n)
+    items = []
+    for i in range(n):
+        items.append({
+            "id": str(i + 1),
+            "project": PROJECTS[i % len(PROJECTS)],
+            "title": f"Expense {i}",
+            "description": "Catering, room rental and printed material for the event",
+            "expense_date": [str(np.datetime64("2024-01-01") + days[i]), "unknown", None][i % 3],
+            "exact_amount": float(rng.integers(1, 5000)) if i % 2 else None,
+            "estimated": None if i % 2 else 100.0,
+            "conservative": None if i % 2 else 150.0,
+            "worst_case": None if i % 2 else 200.0,
+            "priority": i % 5 + 1,
+            "status": STATUSES[i % 3],
+            "version": 1,
+        })
+    return items
+
+
+# Früheres Layout: dieselben Werte als object-Strings und Int64
+def legacy_frame(df):
+    return readable_frame(df).astype({"priority": "Int64"})
+
+
+def legacy_filter(df):
+    unknown = (df["expense_date"] == "unknown").to_numpy(dtype=bool, na_value=False)
+    mask = df["project"].isin(PROJECTS[:6]).to_numpy() & df["status"].isin(STATUSES[:2]).to_numpy()
+    return df[mask & (df["expense_date"].isna().to_numpy() | unknown)]
+
+
+def compact_filter(df):
+    mask = df["project"].isin(PROJECTS[:6]).to_numpy() & df["status"].isin(STATUSES[:2]).to_numpy()
+    return df[mask & (df["no_date"].to_numpy() | df["date_unknown"].to_numpy())]
+
+
+def groupby_sums(df):
+    return df.groupby("project", observed=True)[["exact_amount", "estimated", "worst_case"]].sum()
+
+
+def legacy_project_sort(df):
+    df = df.assign(project_lower=df["project"].str.lower())
+    return df.sort_values(by="project_lower").drop(columns="project_lower")
+
+
+def compact_project_sort(df):
+    return df.sort_values(by="project")
+
+
+def best_of(function, df, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    for n in (10_000, 100_000):
+        compact = items_to_dataframe(make_items(n))
+        legacy = legacy_frame(compact)
+        print(f"{n} rows {'legacy':>28} {'compact':>11}")
+        print(f"  {'memory per 10k rows':<22} {legacy.memory_usage(deep=True).sum() / n * 10_000 / 1e6:>8.2f} MB "
+              f"{compact.memory_usage(deep=True).sum() / n * 10_000 / 1e6:>8.2f} MB")
+        for name, legacy_fn, compact_fn in (("filter", legacy_filter, compact_filter),
+                                            ("groupby project", groupby_sums, groupby_sums),
+                                            ("sort by project", legacy_project_sort, compact_project_sort)):
+            legacy_ms = best_of(legacy_fn, legacy) * 1000
+            compact_ms = best_of(compact_fn, compact) * 1000
+            print(f"  {name:<22} {legacy_ms:>8.2f} ms {compact_ms:>8.2f} ms {legacy_ms / compact_ms:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
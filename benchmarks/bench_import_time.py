@@ -0,0 +1,47 @@
+# Benchmark: Kaltstart der Login-Seite
+# Misst in frischen Interpretern, wie lange das Importieren von board.py (bis und mit der gezeichneten Login-Seite)
+# dauert, verglichen mit den Modulen, die board.py früher schon beim Import geladen hat. Zusätzlich wird geprüft,
+# welche schweren Module nach dem Laden der Login-Seite bereits importiert sind.
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_import_time
+import os
+import subprocess
+import sys
+
+# Früher beim Import von board.py geladen (direkt oder über storage/charts/exports/expenses)
+LEGACY_IMPORTS = ["pandas", "numpy", "streamlit", "psycopg2", "plotly.express", "plotly.graph_objects",
+                  "matplotlib.patches", "matplotlib.figure", "matplotlib.backends.backend_agg",
+                  "xlsxwriter", "pyarrow", "pyarrow.parquet", "boto3", "boto3.dynamodb.conditions"]
+HEAVY_MODULES = ["pandas", "plotly.express", "matplotlib", "xlsxwriter", "pyarrow", "boto3", "psycopg2"]
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = {**os.environ, "OIKOS_BOARD_PASSWORD": os.getenv("OIKOS_BOARD_PASSWORD", "benchmark"),
+       "AWS_REGION": os.getenv("AWS_REGION", "eu-central-1")}
+
+
+# Laufzeit eines Python-Snippets in einem frischen Interpreter (ohne den Start des Interpreters selbst)
+def run_fresh(code):
+    script = f"import time\nstart = time.perf_counter()\n{code}\nprint(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_DIR, env=ENV, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def best_of(code, repeat=5):
+    return min(run_fresh(code) for _ in range(repeat))
+
+
+def main():
+    legacy = best_of("\n".join(f"import {module}" for module in LEGACY_IMPORTS))
+    # Ohne Streamlit-Server läuft board.py im "bare mode" und zeichnet die Login-Seite ins Leere
+    login = best_of("import board")
+    print(f"{'eager imports (before)':<28} {legacy * 1000:>8.0f} ms")
+    print(f"{'import board + login page':<28} {login * 1000:>8.0f} ms {legacy / login:>6.1f}x")
+
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import sys, board; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"],
+        cwd=PROJECT_DIR, env=ENV, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1:]
+    print(f"{'heavy modules after login':<28} {(loaded[0] if loaded and loaded[0] else 'none')}")
+
+
+if __name__ == "__main__":
+    main()
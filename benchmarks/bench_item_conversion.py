@@ -0,0 +1,96 @@
+# Benchmark: Umwandlung der DynamoDB-Items in den Expense-DataFrame
+# Vergleicht die frühere Zeilen-Schleife mit der spaltenweisen Umwandlung in expenses.items_to_dataframe().
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_item_conversion
+import os
+import time
+from decimal import Decimal
+
+import pandas as pd
+
+os.environ.setdefault("AWS_REGION", "eu-central-1")
+
+from expenses import EXPENSE_COLUMNS, items_to_dataframe
+
+
+# Synthetische Items, wie sie boto3 liefert (Zahlen als Decimal, teilweise fehlende Attribute)
+def make_items(n):
+    items = []
+    for i in range(n):
+        item = {
+            "id": str(i + 1),
+            "project": ["oikos Conference", "Action Days", "Oismak", "oikos Solar"][i % 4],
+            "title": f"Expense {i}",
+            "description": "Catering, room rental and printed material for the event",
+            "priority": Decimal(i % 5 + 1),
+        }
+        if i % 2:
+            item["exact_amount"] = Decimal("120.50")
+            item["expense_date"] = "2024-05-01"
+            item["status"] = "approved"
+        else:
+            item["estimated"] = Decimal("100")
+            item["conservative"] = Decimal("150")
+            item["worst_case"] = Decimal("200.75")
+            item["expense_date"] = "unknown"
+        items.append(item)
+    return items
+
+
+# Frühere Umwandlung aus get_data(): Konvertierung pro Zeile, DataFrame, danach astype
+def legacy_items_to_dataframe(data):
+    for item in data:
+        item['exact_amount'] = float(item['exact_amount']) if 'exact_amount' in item and item['exact_amount'] is not None else None
+        item['estimated'] = float(item['estimated']) if 'estimated' in item and item['estimated'] is not None else None
+        item['conservative'] = float(item['conservative']) if 'conservative' in item and item['conservative'] is not None else None
+        item['worst_case'] = float(item['worst_case']) if 'worst_case' in item and item['worst_case'] is not None else None
+        item['priority'] = int(item['priority']) if 'priority' in item and item['priority'] is not None else None
+        item['id'] = str(item['id']) if 'id' in item else None
+        item['project'] = str(item['project']) if 'project' in item else None
+        item['title'] = str(item['title']) if 'title' in item else None
+        item['description'] = str(item['description']) if 'description' in item else None
+        item['expense_date'] = str(item['expense_date']) if 'expense_date' in item else None
+        item['status'] = str(item['status']) if 'status' in item else "not assigned"
+
+    df = pd.DataFrame(data)
+    for col in EXPENSE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    return df.astype({
+        "id": str,
+        "project": str,
+        "title": str,
+        "description": str,
+        "expense_date": str,
+        "exact_amount": "float64",
+        "estimated": "float64",
+        "conservative": "float64",
+        "worst_case": "float64",
+        "priority": "Int64",
+        "status": str
+    }, errors="ignore")
+
+
+# Bester Wert aus mehreren Durchläufen; die Items werden jedes Mal frisch kopiert,
+# weil die alte Schleife sie verändert
+def best_of(function, items, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        data = [dict(item) for item in items]
+        start = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{'items':>8} {'row loop [ms]':>14} {'columnar [ms]':>14} {'speedup':>8}")
+    for n in (1_000, 10_000, 50_000):
+        items = make_items(n)
+        legacy = best_of(legacy_items_to_dataframe, items)
+        columnar = best_of(items_to_dataframe, items)
+        print(f"{n:>8} {legacy * 1000:>14.1f} {columnar * 1000:>14.1f} {legacy / columnar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Benchmark: Rastern der vier Kuchendiagramme im Insights-Tab
+# Vergleicht das Rastern nacheinander im Script-Thread mit charts.pie_pngs() im Prozess-Pool, einmal mit
+# frisch gestartetem Pool (inklusive Start der Prozesse und Import von matplotlib) und einmal mit warmem Pool,
+# sowie den Zugriff auf bereits gerasterte Diagramme im Cache. Zusätzlich die Importzeit von charts in einem
+# Worker-Prozess. Der Gewinn des Pools hängt von der Anzahl CPUs ab (siehe Ausgabe).
+# Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_pie_render
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import charts
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Vier Kuchendiagramme (ein Szenario pro Diagramm) mit `wedges` Segmenten; `seed` ändert die Werte,
+# damit der Cache nicht trifft
+def make_pies(wedges, seed):
+    rng = np.random.default_rng(seed)
+    colors = [f"#{rng.integers(0, 0xFFFFFF):06x}" for _ in range(wedges)]
+    legend = [(f"Project {i}: {100 / wedges:.1f}%", color) for i, color in enumerate(colors)]
+    return [(rng.random(wedges) * 1000, colors, legend, title) for title in ("Exact", "Estimated", "Conservative", "Worst Case")]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def serial(pies):
+    return [charts.render_pie_png(*pie) for pie in pies]
+
+
+def main():
+    print(f"CPUs: {os.cpu_count()}, workers: {charts.CHART_WORKERS}")
+    worker_import = subprocess.run(
+        [sys.executable, "-c", "import time; start = time.perf_counter(); import charts; print(time.perf_counter() - start)"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    print(f"{'import charts (worker)':<24} {float(worker_import) * 1000:>8.0f} ms")
+
+    charts.render_pie_png(*make_pies(12, 0)[0])  # matplotlib im Script-Prozess laden
+    print(f"{'wedges':>8} {'serial':>10} {'pool cold':>10} {'pool warm':>10} {'cached':>10}")
+    for wedges in (12, 200):
+        charts.reset_render_pool()
+        serial_s = timed(serial, make_pies(wedges, 1))
+        cold_s = timed(charts.pie_pngs, make_pies(wedges, 2))
+        warm_s = timed(charts.pie_pngs, make_pies(wedges, 3))
+        cached_s = timed(charts.pie_pngs, make_pies(wedges, 3))
+        print(f"{wedges:>8} {serial_s:>9.2f}s {cold_s:>9.2f}s {warm_s:>9.2f}s {cached_s * 1000:>8.1f}ms")
+    charts.reset_render_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,22 @@
-import pandas as pd
-import numpy as np
 import streamlit as st
-import psycopg2
 import hashlib
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from io import BytesIO
-import xlsxwriter
-import plotly.express as px
 import os
-import boto3
-import uuid
+from functools import partial
 
+# Die Login-Seite braucht nur Streamlit. pandas, Speicher-Backend (boto3), Diagramme (plotly, matplotlib)
+# und Exporte (xlsxwriter, pyarrow) werden erst in app() bzw. in der jeweiligen Ansicht importiert.
 
-# AWS DynamoDB-Client initialisieren
-dynamodb = boto3.resource(
-    "dynamodb",
-    region_name=os.getenv("AWS_REGION"),
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-)
 
-table_name = "oikos_budgeting"
-table = dynamodb.Table(table_name)
+# Auswahl für die Anzahl Karten pro Seite im Overview-Tab
+CARD_PAGE_SIZES = [12, 24, 48, 96]
+DEFAULT_CARD_PAGE_SIZE = int(os.getenv("OIKOS_CARDS_PER_PAGE", "24"))
+if DEFAULT_CARD_PAGE_SIZE not in CARD_PAGE_SIZES:
+    CARD_PAGE_SIZES = sorted(CARD_PAGE_SIZES + [DEFAULT_CARD_PAGE_SIZE])
 
+# Ansichten der App (nur die gewählte wird bei einem Rerun berechnet)
+VIEWS = ["Overview", "Insights", "Edit"]
+# Sortieroptionen und die Spalte, nach der sortiert wird (expenses.SORT_KEYS)
+SORT_OPTIONS = {"ID": "id", "Project": "project", "Priority": "priority", "Date": "expense_date"}
 
 # Benutzer und Passwörter aus Umgebungsvariablen lesen
 users = {
@@ -47,6 +39,11 @@ st.markdown("""
 
 # Haupt-App
 def app():
+    import pandas as pd
+    from storage import ExpenseFilter
+    from expenses import get_filtered_expenses, known_projects, get_expense, create_expense, update_expense_status, update_expense_statuses, delete_expense, readable_frame, frame_columns, empty_expense_frame, EXPENSE_COLUMNS
+    from projects import project_registry
+
     st.title("Hey oikee!")
     st.subheader(f"Welcome to the oikos budgeting tool.")
     st.write("")
@@ -57,132 +54,33 @@ def app():
     st.write("")
     st.header("View registered expenses")
 
-    # Funktion zum Abrufen aller Daten aus DynamoDB
-    def get_data():
+    # Funktion zum Abrufen der gefilterten Daten (aus dem gemeinsamen Snapshot oder per Query, siehe plan_query)
+    def get_data(filters, sort_by=None):
         try:
-            response = table.scan()
-            data = response.get("Items", [])
-            
-            # Falls die Tabelle leer ist, gib einen leeren DataFrame zurück
-            if not data:
-                return pd.DataFrame(columns=["id", "project", "title", "description", "expense_date", 
-                                             "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"])
-            
-            # Konvertiere DynamoDB-Daten und prüfe auf None
-            for item in data:
-                item['exact_amount'] = float(item['exact_amount']) if 'exact_amount' in item and item['exact_amount'] is not None else None
-                item['estimated'] = float(item['estimated']) if 'estimated' in item and item['estimated'] is not None else None
-                item['conservative'] = float(item['conservative']) if 'conservative' in item and item['conservative'] is not None else None
-                item['worst_case'] = float(item['worst_case']) if 'worst_case' in item and item['worst_case'] is not None else None
-                item['priority'] = int(item['priority']) if 'priority' in item and item['priority'] is not None else None
-                item['id'] = str(item['id']) if 'id' in item else None
-                item['project'] = str(item['project']) if 'project' in item else None
-                item['title'] = str(item['title']) if 'title' in item else None
-                item['description'] = str(item['description']) if 'description' in item else None
-                item['expense_date'] = str(item['expense_date']) if 'expense_date' in item else None
-                item['status'] = str(item['status']) if 'status' in item else "not assigned"  # Standardwert setzen
-            
-            # Erstelle den DataFrame
-            df = pd.DataFrame(data)
-    
-            # Sicherstellen, dass alle Spalten existieren
-            required_columns = ["id", "project", "title", "description", "expense_date", 
-                                "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"]
-            for col in required_columns:
-                if col not in df.columns:
-                    df[col] = None
-    
-            # Optimierte Typumwandlung ohne doppelte Verarbeitung
-            df = df.astype({
-                "id": str,
-                "project": str,
-                "title": str,
-                "description": str,
-                "expense_date": str,
-                "exact_amount": "float64",
-                "estimated": "float64",
-                "conservative": "float64",
-                "worst_case": "float64",
-                "priority": "Int64",  # Int64 erlaubt auch NaN
-                "status": str
-            }, errors="ignore")  # Falls Spalten fehlen, wird kein Fehler geworfen
-    
-            return df
-    
+            return get_filtered_expenses(filters, sort_by)
         except Exception as e:
-            st.error(f"Error connecting to DynamoDB: {e}")
-            return pd.DataFrame()
-
-
-    # Funktion zum Abrufen der Farbe basierend auf dem Projektnamen
-    def get_color(project_name):
-        if project_name == "oikos Conference":
-            return "#4386e8"
-        elif project_name == "Sustainability Week":
-            return "#66ddc1"
-        elif project_name == "Action Days":
-            return "#e1d9c4"
-        elif project_name == "Curriculum Change":
-            return "#e681e5"
-        elif project_name == "UN-DRESS":
-            return "#a3a3a3"
-        elif project_name == "ChangeHub":
-            return "#f7be6d"
-        elif project_name == "oikos Solar":
-            return "#ffda03"
-        elif project_name == "oikos Catalyst":
-            return "#7fcaf9"
-        elif project_name == "Climate Neutral Events":
-            return "#3a9953"
-        elif project_name == "oikos Consulting":
-            return "#b84040"
-        elif project_name == "Sustainable Finance":
-            return "#fa8128"
-        elif project_name == "Oismak":
-            return "#bccbdd"
-        else:
-            return "#FFFFFF"  # Standardfarbe
+            st.error(f"Error connecting to the database: {e}")
+            return empty_expense_frame()[frame_columns(EXPENSE_COLUMNS)]
 
-    # Daten aus der Datenbank abrufen
-    df = get_data()
 
+    # Radio Buttons für die Sortieroptionen
+    sort_option = st.radio(
+        "Sort data by:",
+        tuple(SORT_OPTIONS),
+        index=0  # Standardmäßig "ID" auswählen
+    )
 
-    # Gewünschte Spaltenreihenfolge definieren
-    desired_order = ["id", "project", "title", "description", "expense_date", 
-                     "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"]
-    
-    # Spalten in der gewünschten Reihenfolge anordnen (überschreibt df)
-    df = df[desired_order]
-
-    
-    if df is not None:
-
-        # Radio Buttons für die Sortieroptionen
-        sort_option = st.radio(
-            "Sort data by:",
-            ("ID", "Project", "Priority", "Date"),
-            index=0  # Standardmäßig "ID" auswählen
-        )
-
-        # Sortierung basierend auf der Benutzerwahl
-        if sort_option == "ID":
-            df = df.sort_values(by="id")
-        elif sort_option == "Project":
-            df = df.assign(project_lower=df['project'].str.lower())  # Neue Spalte mit kleinbuchstabigen Projektnamen hinzufügen
-            df = df.sort_values(by="project_lower").drop(columns="project_lower")  # Sortiere nach der neuen Spalte und entferne sie danach
-        elif sort_option == "Priority":
-            df = df.sort_values(by="priority", ascending=True)
-        elif sort_option == "Date":
-            df = df.sort_values(by="expense_date")
-
-        st.write("")
+    st.write("")
 
 
+    # Die Filter stehen in einem Formular: Klicks auf die Checkboxen lösen keinen Rerun aus,
+    # erst "Apply filters" lädt die Ansicht einmal neu
+    with st.form("filter_form", border=False):
         # Checkboxen für die Filterung nach Projekten
         st.write("Select Projects to Display:")
 
-        # Ermitteln der eindeutigen Projekte
-        unique_projects = df['project'].unique()
+        # Projekte aus dem Snapshot (bzw. die bekannte Projektliste, solange noch nichts geladen ist)
+        unique_projects = known_projects()
 
         # Anzahl der Spalten definieren
         cols = st.columns(3, vertical_alignment="top")  # Erstellen der Spalten
@@ -196,10 +94,6 @@ def app():
             if col.checkbox(project, value=True):
                 selected_projects.append(project)
 
-        # Filtere den DataFrame basierend auf den ausgewählten Projekten
-        if selected_projects:
-            df = df[df['project'].isin(selected_projects)]
-
         st.write("")
 
         col1, col2, col3 = st.columns(3)
@@ -213,24 +107,9 @@ def app():
             filter_unknown = st.checkbox("Unknown", value=True)
             filter_with_date = st.checkbox("Date", value=True)
 
-            # Filterlogik für 'expense_date'
-            if filter_no_date or filter_unknown or filter_with_date:
-                date_conditions = []
-                
-                if filter_no_date:
-                    # Filter für None in 'expense_date'
-                    date_conditions.append(df['expense_date'].isna())
-                
-                if filter_unknown:
-                    # Filter für 'unknown' in 'expense_date'
-                    date_conditions.append(df['expense_date'] == 'unknown')
-                
-                if filter_with_date:
-                    # Filter für gültige Daten (nicht None und nicht 'unknown')
-                    date_conditions.append((df['expense_date'].notna()) & (df['expense_date'] != 'unknown'))
-                
-                # Kombiniere alle Bedingungen mit OR (any)
-                df = df[np.logical_or.reduce(date_conditions)]
+            # Ausgewählte Datumsklassen (keine Auswahl = kein Filter)
+            selected_date_classes = [name for name, selected in
+                                     (("no_date", filter_no_date), ("unknown", filter_unknown), ("date", filter_with_date)) if selected]
 
 
         with col2:
@@ -241,19 +120,8 @@ def app():
             show_exact = st.checkbox("Exact", value=True)
             show_estimated = st.checkbox("Estimated", value=True)
 
-            # Filtere den DataFrame basierend auf den Checkboxen
-            if show_exact and not show_estimated:
-                # Zeige nur Einträge mit einem genauen Betrag (nicht leer)
-                df = df[df['exact_amount'].notna()]
-            elif show_estimated and not show_exact:
-                # Zeige nur Einträge, bei denen der genaue Betrag leer ist (also geschätzt)
-                df = df[df['exact_amount'].isna()]
-            elif not show_exact and not show_estimated:
-                # Falls beide Checkboxen deaktiviert sind, wird kein Eintrag angezeigt
-                df = df[df['exact_amount'] == None]
-            # Wenn beide aktiviert sind, wird der gesamte DataFrame angezeigt (kein Filter)
-
-
+            # Sind beide deaktiviert, wird kein Eintrag angezeigt; sind beide aktiviert, gibt es keinen Filter
+            selected_amount_types = [name for name, selected in (("exact", show_exact), ("estimated", show_estimated)) if selected]
 
 
         with col3:
@@ -268,110 +136,185 @@ def app():
                 if st.checkbox(f"Priority {priority}", value=True):
                     selected_priorities.append(priority)
 
-            # Filtere den DataFrame basierend auf den ausgewählten Prioritäten
-            if selected_priorities:
-                df = df[df['priority'].isin(selected_priorities)]
+        st.form_submit_button("Apply filters")
 
 
+    # Auswahl als Filter zusammenfassen; schmale Auswahlen werden direkt über die Indizes der Datenbank gelesen.
+    # Sind alle Projekte ausgewählt, gibt es keinen Projektfilter (so erscheinen auch Projekte ohne eigene Checkbox).
+    filters = ExpenseFilter(
+        projects=frozenset(selected_projects) if selected_projects and len(selected_projects) < len(unique_projects) else None,
+        priorities=frozenset(selected_priorities) if selected_priorities else None,
+        date_classes=frozenset(selected_date_classes) if selected_date_classes else None,
+        amount_types=frozenset(selected_amount_types) if len(selected_amount_types) < 2 else None
+    )
 
-        # DataFrame anzeigen
-        st.write("")
-        st.dataframe(df.set_index('id'), height = 250)
+    # Daten aus der Datenbank abrufen, bereits in der gewählten Reihenfolge (vorsortierte Indizes des Snapshots)
+    df = get_data(filters, sort_by=SORT_OPTIONS[sort_option])
+
+    # Spalten in der gewünschten Reihenfolge anordnen (überschreibt df); die Datums-Flags bleiben für die Karten
+    df = df[frame_columns(EXPENSE_COLUMNS)]
+
+    # DataFrame anzeigen
+    st.write("")
+    st.dataframe(readable_frame(df).set_index('id'), height = 250)
 
-    tab1, tab2, tab3 = st.tabs(["Overview", "Insights", "Edit"])
+    # Navigation statt st.tabs: st.tabs führt den Inhalt aller Tabs bei jedem Rerun aus, hier wird nur die
+    # gewählte Ansicht berechnet. Die Filter oben bleiben beim Wechsel erhalten (Session-State der Widgets).
+    active_view = st.segmented_control("View", VIEWS, default=VIEWS[0], required=True, key="active_view", label_visibility="collapsed")
+
+    if active_view == "Overview":
+        from exports import excel_export, csv_export, parquet_export, PARQUET_AVAILABLE
 
-    with tab1:
         # Generiere die Container basierend auf dem sortierten DataFrame
         st.write("")
 
         # Funktion zum Aktualisieren des Status eines Eintrags
         def update_status(expense_id, new_status):
             try:
-                table.update_item(
-                    Key={"id": str(expense_id)},  # ID muss String sein
-                    UpdateExpression="SET #s = :s",
-                    ExpressionAttributeNames={"#s": "status"},
-                    ExpressionAttributeValues={":s": new_status},
-                    ReturnValues="UPDATED_NEW"
-                )
+                # Setzt auch updated_at/version und übernimmt die Änderung in den Snapshot
+                update_expense_status(expense_id, new_status)
             except Exception as error:
                 st.error(f"Error updating expense status: {error}")
 
+        # Setzt den Status aller ausgewählten Einträge in einem Batch; danach genügt ein einziger Rerun
+        def update_statuses(expense_ids, new_status):
+            try:
+                update_expense_statuses(expense_ids, new_status)
+                return True
+            except Exception as error:
+                st.error(f"Error updating expense status: {error}")
+                return False
 
-        def display_expenses_by_status(df, status, section_title):
-            #CSS für keinen Rand bei Buttons
-            st.markdown("""
-                <style>
-                .stButton button {
-                    border: none;
-                    background-color: transparent;
-                    box-shadow: none;
-                    padding: 0;
-                }
-                </style>
-            """, unsafe_allow_html=True)
+        # Mögliche Sammelaktionen pro Sektion: (Beschriftung, neuer Status)
+        bulk_actions = {
+            'not assigned': [("✅ Approve selected", 'approved'), ("❌ Reject selected", 'rejected')],
+            'approved': [("⏹️ Unassign selected", 'not assigned'), ("❌ Reject selected", 'rejected')],
+            'rejected': [("⏹️ Unassign selected", 'not assigned'), ("✅ Approve selected", 'approved')],
+        }
+
+
+        #CSS für keinen Rand bei Buttons
+        st.markdown("""
+            <style>
+            .stButton button {
+                border: none;
+                background-color: transparent;
+                box-shadow: none;
+                padding: 0;
+            }
+            </style>
+        """, unsafe_allow_html=True)
+
+        # Anzahl Karten pro Seite (Vielfaches von 3, damit die Zeilen voll sind)
+        page_size = st.selectbox("Cards per page", CARD_PAGE_SIZES, index=CARD_PAGE_SIZES.index(DEFAULT_CARD_PAGE_SIZE))
+
+
+        # Eine Karte mit Details und Status-Buttons; `color` kommt aus project_registry.colors() für die ganze Seite
+        def display_expense_card(col, entry, color):
+
+            # Container-Inhalt mit den Details der Expense
+            container_content = f"""
+            <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
+                <p><strong>ID: </strong>{entry['id']}</p>
+                <p><strong>Project: </strong>{entry['project']}</p>
+                <h4>{entry['title']}</h4>
+                <p>{entry['description']}</p>
+                <p><strong>Date: </strong>{entry['expense_date']}</p>
+                <p><strong>Amount:</strong> CHF {entry['exact_amount'] if pd.notna(entry['exact_amount']) else f"{entry['estimated'] or 0} / {entry['conservative'] or 0} / {entry['worst_case'] or 0}"}</p>
+                <p><strong>Priority:</strong> {entry['priority']}</p>
+                <p><strong>Status:</strong> {entry['status']}</p>
+            </div>
+            """
+            col.markdown(container_content, unsafe_allow_html=True)
 
+            # Buttons in einer horizontalen Linie innerhalb des Containers anzeigen
+            with col.container():
+                col1, col2, col3 = st.columns([1.7, 1, 1])  # Zwei Spalten für die Buttons
+                with col3:
+                    st.checkbox("Select", key=f"select_{entry['id']}", label_visibility="collapsed")
+                if entry['status'] == 'not assigned':
+                    with col1:
+                        if st.button("✅", key=f"approve_{entry['id']}"):
+                            update_status(entry['id'], 'approved')
+                            st.rerun()
+                    with col2:
+                        if st.button("❌", key=f"reject_{entry['id']}"):
+                            update_status(entry['id'], 'rejected')
+                            st.rerun()
+
+                elif entry['status'] == 'approved':
+                    with col1:
+                        if st.button("⏹️", key=f"not_assigned_{entry['id']}"):
+                            update_status(entry['id'], 'not assigned')
+                            st.rerun()
+                    with col2:
+                        if st.button("❌", key=f"reject_{entry['id']}"):
+                            update_status(entry['id'], 'rejected')
+                            st.rerun()
+
+                elif entry['status'] == 'rejected':
+                    with col1:
+                        if st.button("⏹️", key=f"not_assigned_{entry['id']}"):
+                            update_status(entry['id'], 'not assigned')
+                            st.rerun()
+                    with col2:
+                        if st.button("✅", key=f"approve_{entry['id']}"):
+                            update_status(entry['id'], 'approved')
+                            st.rerun()
+
+
+        # Zusammenfassung einer Sektion (Anzahl und Summen), auch wenn die Karten eingeklappt sind
+        def section_summary(df_filtered):
+            exact_total = df_filtered['exact_amount'].sum()
+            estimated = df_filtered[df_filtered['exact_amount'].isna()]
+            return (f"{len(df_filtered)} expenses · CHF {exact_total:,.2f} exact · "
+                    f"CHF {estimated['estimated'].sum():,.2f} / {estimated['conservative'].sum():,.2f} / "
+                    f"{estimated['worst_case'].sum():,.2f} estimated")
+
+
+        # Jede Sektion ist ein Fragment: Auswahl, Seitenwechsel und Aufklappen laufen nur in der Sektion neu.
+        # Statusänderungen verschieben Karten zwischen den Sektionen und laden deshalb die ganze Ansicht neu.
+        @st.fragment
+        def display_expenses_by_status(df, status, section_title):
             # Filtere den DataFrame nach dem Status
             df_filtered = df[df['status'] == status]
 
             if not df_filtered.empty:
                 st.subheader(section_title)
-                for i in range(0, len(df_filtered), 3):
+                st.caption(section_summary(df_filtered))
+
+                # Karten nur anzeigen, wenn die Sektion aufgeklappt ist (standardmässig nur die offenen Einträge)
+                if not st.toggle("Show cards", value=status == 'not assigned', key=f"show_cards_{status}"):
+                    return
+
+                # Mehrfachauswahl: die Checkboxen der Karten stehen aus dem letzten Durchlauf im Session-State
+                action_cols = st.columns([1.2, 1, 1, 1.8])
+                select_all = action_cols[0].checkbox("Select all", key=f"select_all_{status}")
+                selected_ids = [expense_id for expense_id in df_filtered['id']
+                                if select_all or st.session_state.get(f"select_{expense_id}")]
+                for action_col, (label, new_status) in zip(action_cols[1:], bulk_actions[status]):
+                    if action_col.button(label, key=f"bulk_{status}_{new_status}", disabled=not selected_ids):
+                        if update_statuses(selected_ids, new_status):
+                            # Auswahl zurücksetzen, sonst sind die Einträge in ihrer neuen Sektion noch ausgewählt
+                            for key in [f"select_all_{status}"] + [f"select_{expense_id}" for expense_id in selected_ids]:
+                                st.session_state.pop(key, None)
+                            st.rerun()
+                action_cols[3].write(f"{len(selected_ids)} selected")
+
+                # Nur die Widgets der aktuellen Seite erzeugen
+                page_count = (len(df_filtered) - 1) // page_size + 1
+                page = 1
+                if page_count > 1:
+                    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1, key=f"page_{status}")
+                df_page = df_filtered.iloc[(page - 1) * page_size:page * page_size]
+                records = readable_frame(df_page).to_dict('records')
+                colors = project_registry.colors(df_page['project'])
+
+                for i in range(0, len(records), 3):
                     cols = st.columns(3)
-                    for j, col in enumerate(cols):
-                        if i + j < len(df_filtered):
-                            entry = df_filtered.iloc[i + j]
-                            color = get_color(entry['project'])
-
-                            with col:
-                                # Container-Inhalt mit den Details der Expense
-                                container_content = f"""
-                                <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
-                                    <p><strong>ID: </strong>{entry['id']}</p>
-                                    <p><strong>Project: </strong>{entry['project']}</p>
-                                    <h4>{entry['title']}</h4>
-                                    <p>{entry['description']}</p>
-                                    <p><strong>Date: </strong>{entry['expense_date']}</p>
-                                    <p><strong>Amount:</strong> CHF {entry['exact_amount'] if pd.notna(entry['exact_amount']) else f"{entry['estimated'] or 0} / {entry['conservative'] or 0} / {entry['worst_case'] or 0}"}</p>
-                                    <p><strong>Priority:</strong> {entry['priority']}</p>
-                                    <p><strong>Status:</strong> {entry['status']}</p>
-                                </div>
-                                """
-                                col.markdown(container_content, unsafe_allow_html=True)
-
-                                # Buttons in einer horizontalen Linie innerhalb des Containers anzeigen
-                                with col.container():
-                                    col1, col2, col3 = st.columns([1.7, 1, 1])  # Zwei Spalten für die Buttons
-                                    if entry['status'] == 'not assigned':
-                                        with col1:
-                                            if st.button("✅", key=f"approve_{entry['id']}"):
-                                                update_status(entry['id'], 'approved')
-                                                st.rerun()
-                                        with col2:
-                                            if st.button("❌", key=f"reject_{entry['id']}"):
-                                                update_status(entry['id'], 'rejected')
-                                                st.rerun()
-
-                                    elif entry['status'] == 'approved':
-                                        with col1:
-                                            if st.button("⏹️", key=f"not_assigned_{entry['id']}"):
-                                                update_status(entry['id'], 'not assigned')
-                                                st.rerun()
-                                        with col2:
-                                            if st.button("❌", key=f"reject_{entry['id']}"):
-                                                update_status(entry['id'], 'rejected')
-                                                st.rerun()
-
-                                    elif entry['status'] == 'rejected':
-                                        with col1:
-                                            if st.button("⏹️", key=f"not_assigned_{entry['id']}"):
-                                                update_status(entry['id'], 'not assigned')
-                                                st.rerun()
-                                        with col2:
-                                            if st.button("✅", key=f"approve_{entry['id']}"):
-                                                update_status(entry['id'], 'approved')
-                                                st.rerun()
-
+                    for col, entry, color in zip(cols, records[i:i + 3], colors[i:i + 3]):
+                        with col:
+                            display_expense_card(col, entry, color)
 
                     st.write("")
 
@@ -385,238 +328,50 @@ def app():
         st.write("")
         st.write("")
 
-        def create_excel_with_overview(df):
-            # Excel-Datei in den Speicher schreiben
-            output = BytesIO()
-
-            # Erstellen eines Pandas-Excel-Writers mit XlsxWriter
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                # Übersichtsliste für das Overview-Tabellenblatt
-                overview_data = []
-
-                # Finde alle eindeutigen Projekte
-                projects = df['project'].unique()
-
-                # Berechne die Übersichtsdaten und speichere sie für das Overview-Tabellenblatt
-                for project in projects:
-                    # Filtere die Daten für das Projekt
-                    df_project = df[df['project'] == project]
-
-                    # Schreibe den gefilterten DataFrame auf ein separates Tabellenblatt
-                    df_project.to_excel(writer, sheet_name=project, index=False)
-
-                    # Berechne die Übersichtsdaten für das Projekt
-                    total_entries = len(df_project)
-
-                    # Zähle Einträge mit exact_amount, die größer als 0 sind
-                    exact_entries = (df_project['exact_amount'] > 0).sum()
-
-                    # Summiere die Werte der exact_amount
-                    exact_sum = df_project['exact_amount'].sum(skipna=True)
-
-                    # Zähle Einträge, bei denen exact_amount NaN oder 0 ist und estimated Werte vorhanden sind
-                    estimated_entries = ((df_project['exact_amount'].isna()) | (df_project['exact_amount'] == 0)).sum()
-
-                    # Summiere die Werte der estimated Spalte
-                    estimated_sum = df_project['estimated'].sum(skipna=True)
-
-                    # Summiere die Werte der konservativen und worst_case Schätzungen
-                    conservative_sum = df_project['conservative'].sum(skipna=True)
-                    worst_case_sum = df_project['worst_case'].sum(skipna=True)
-
-                    # Füge die Daten zur Übersicht hinzu
-                    overview_data.append({
-                        'Projekt': project,
-                        'Registered Expenses': total_entries,
-                        'Exact Expenses': exact_entries,
-                        'Total Exact Expenses': exact_sum,
-                        'Estimated Expenses': estimated_entries,
-                        'Total Estimated': estimated_sum,
-                        'Total Conservatively Estimated': conservative_sum,
-                        'Total Worst Case': worst_case_sum
-                    })
-
-                # Erstelle das Overview DataFrame
-                overview_df = pd.DataFrame(overview_data)
-
-                # Schreibe das Overview-Tabellenblatt als erstes Blatt
-                overview_df.to_excel(writer, sheet_name='Overview', index=False)
-
-                # Schreibe jedes Projekt auf ein eigenes Tabellenblatt
-                for project in projects:
-                    df_project = df[df['project'] == project]
-                    df_project.to_excel(writer, sheet_name=project, index=False)
-
-                # Hole den XlsxWriter-Objekt für weitere Formatierungen
-                workbook = writer.book
-                overview_worksheet = writer.sheets['Overview']
-
-                # Überschrift formatieren
-                header_format = workbook.add_format({
-                    'bold': True,
-                    'text_wrap': True,
-                    'valign': 'top',
-                    'fg_color': '#D7E4BC',
-                    'border': 1
-                })
-
-                # Wende Formatierung auf die erste Zeile des Overview-Blattes an
-                for col_num, value in enumerate(overview_df.columns.values):
-                    overview_worksheet.write(0, col_num, value, header_format)
-
-            # Zurückspulen des Speichers
-            output.seek(0)
-
-            return output
-
-
-        # Streamlit Button zum Herunterladen der Excel-Datei
-        excel_file = create_excel_with_overview(df)
-
-        # Download-Button für die formatierte Excel-Datei
-        st.download_button(
+        # Download-Buttons für die Exporte; die Dateien werden erst beim Klick erzeugt
+        # (und für gleiche Daten aus dem Cache genommen), Klicks lösen keinen Rerun aus
+        export_cols = st.columns(3)
+        export_cols[0].download_button(
             label="Download Excel",
-            data=excel_file,
+            data=partial(excel_export, df),
             file_name='oikos_budgeting_projects.xlsx',
-            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            on_click="ignore"
         )
+        export_cols[1].download_button(
+            label="Download CSV",
+            data=partial(csv_export, df),
+            file_name='oikos_budgeting_expenses.csv',
+            mime='text/csv',
+            on_click="ignore"
+        )
+        if PARQUET_AVAILABLE:
+            export_cols[2].download_button(
+                label="Download Parquet",
+                data=partial(parquet_export, df),
+                file_name='oikos_budgeting_expenses.parquet',
+                mime='application/vnd.apache.parquet',
+                on_click="ignore"
+            )
 
 
-    with tab2:
-        # Ersetze NaN-Werte in den relevanten Spalten durch 0
-        df['exact_amount'] = pd.to_numeric(df['exact_amount'], errors='coerce').fillna(0)
-        df['estimated'] = pd.to_numeric(df['estimated'], errors='coerce').fillna(0)
-        df['conservative'] = pd.to_numeric(df['conservative'], errors='coerce').fillna(0)
-        df['worst_case'] = pd.to_numeric(df['worst_case'], errors='coerce').fillna(0)
-
-        # Gruppiere den DataFrame nach Projekt und summiere die Spalten
-        grouped_df = df.groupby('project').agg({
-            'exact_amount': 'sum',
-            'estimated': 'sum',
-            'conservative': 'sum',
-            'worst_case': 'sum'
-        }).reset_index()
+    if active_view == "Insights":
+        import plotly.express as px
+        from insights import compute_insights, scenario_shares, project_pie_wedges, detail_pie_wedges, MAX_PIE_WEDGES, OTHER_LABEL
+        from charts import expenses_per_project_chart, pie_pngs, OTHER_COLOR
 
-        # Berechne die Gesamtsummen NACH der Gruppierung
-        total_exact_amount = grouped_df['exact_amount'].sum()
-        total_estimated = grouped_df['estimated'].sum()
-        total_conservative = grouped_df['conservative'].sum()
-        total_worst_case = grouped_df['worst_case'].sum()
+        # Die Diagramme rechnen mit den gefilterten Einträgen, die die Tabelle oben schon geladen hat
 
-        # Sortiere den DataFrame nach der Worst-Case-Summe in absteigender Reihenfolge
-        grouped_df['total_sum'] = grouped_df['exact_amount'] + grouped_df['worst_case']
-        grouped_df = grouped_df.sort_values(by='total_sum', ascending=True)
+        # Alle Kennzahlen pro Projekt in einem Durchlauf; die Diagramme lesen nur noch aus `summary`
+        rows, summary = compute_insights(df)
 
         st.subheader("Expenses per project")
         # Füge den Toggle-Button in einem rechtsbündigen Container hinzu
         show_sum = st.toggle("Show Total Expenses", value=False)
 
 
-        # Initialisiere das Diagramm
-        fig = go.Figure()
-
-        # Durchlaufe jedes Projekt und füge die Balken hinzu
-        for project in grouped_df['project']:
-            sum_exact_amount = grouped_df.loc[grouped_df['project'] == project, 'exact_amount'].values[0]
-            sum_estimated = grouped_df.loc[grouped_df['project'] == project, 'estimated'].values[0]
-            sum_conservative = grouped_df.loc[grouped_df['project'] == project, 'conservative'].values[0]
-            sum_worst_case = grouped_df.loc[grouped_df['project'] == project, 'worst_case'].values[0]
-
-            # Füge den Balken für das Worst-Case-Szenario hinzu (ganz hinten)
-            fig.add_trace(go.Bar(
-                x=[sum_exact_amount + sum_worst_case],
-                y=[project],  # Projektnamen als Beschriftung verwenden
-                orientation='h',
-                name=f'{project} - Worst Case',
-                marker=dict(color='#FFB3B3'),  # Rot
-                showlegend=False,
-                hoverinfo="x"
-            ))
-
-            # Füge den Balken für das Conservative-Szenario hinzu (darüber)
-            fig.add_trace(go.Bar(
-                x=[sum_exact_amount + sum_conservative],
-                y=[project],
-                orientation='h',
-                name=f'{project} - Conservative',
-                marker=dict(color='#FFD1A9'),  # Orange
-                showlegend=False,
-                hoverinfo="x"
-            ))
-
-            # Füge den Balken für das Estimated-Szenario hinzu (weiter vorne)
-            fig.add_trace(go.Bar(
-                x=[sum_exact_amount + sum_estimated],
-                y=[project],
-                orientation='h',
-                name=f'{project} - Estimated',
-                marker=dict(color='#FDE780'),  # Gelb
-                showlegend=False,
-                hoverinfo="x"
-            ))
-
-            # Füge den Balken für den Exact Amount hinzu (ganz vorne)
-            fig.add_trace(go.Bar(
-                x=[sum_exact_amount],
-                y=[project],
-                orientation='h',
-                name=f'{project} - Exact',
-                marker=dict(color='#AAD4F4'),  # Blau
-                showlegend=False,
-                hoverinfo="x"
-            ))
-
-        # Füge den zusätzlichen Balken für die Gesamtsumme hinzu, wenn der Toggle aktiviert ist
-        if show_sum:
-            fig.add_trace(go.Bar(
-                x=[total_exact_amount + total_worst_case],
-                y=["Total Expenses"],
-                orientation='h',
-                name='Total - Worst Case',
-                marker=dict(color='#FFB3B3'),  # Rot
-                showlegend=True,
-                hoverinfo="x"
-            ))
-
-            fig.add_trace(go.Bar(
-                x=[total_exact_amount + total_conservative],
-                y=["Total Expenses"],
-                orientation='h',
-                name='Total - Conservative',
-                marker=dict(color='#FFD1A9'),  # Orange
-                showlegend=True,
-                hoverinfo="x"
-            ))
-
-            fig.add_trace(go.Bar(
-                x=[total_exact_amount + total_estimated],
-                y=["Total Expenses"],
-                orientation='h',
-                name='Total - Estimated',
-                marker=dict(color='#FDE780'),  # Gelb
-                showlegend=True,
-                hoverinfo="x"
-            ))
-
-            fig.add_trace(go.Bar(
-                x=[total_exact_amount],
-                y=["Total Expenses"],
-                orientation='h',
-                name='Total - Exact',
-                marker=dict(color='#AAD4F4'),  # Blau
-                showlegend=True,
-                hoverinfo="x"
-            ))
-
-        # Layout des Diagramms anpassen
-        fig.update_layout(
-            xaxis_title="CHF",
-            yaxis=dict(showticklabels=True),
-            barmode='overlay',  # Balken überlappen sich
-            height=600,
-            margin=dict(l=10, r=10, t=10, b=10)  # Reduziert die Ränder
-        )
-
+        # Ein Trace pro Szenario (statt vier pro Projekt)
+        fig = expenses_per_project_chart(summary, show_sum)
 
         # Zeige das Diagramm in Streamlit an
         st.plotly_chart(fig)
@@ -625,252 +380,45 @@ def app():
 
 
 
-        # Erstellen der "_complete"-Spalten durch Addition der entsprechenden Spalten
-        df['estimated_complete'] = df['exact_amount'].fillna(0) + df['estimated'].fillna(0)
-        df['conservative_complete'] = df['exact_amount'].fillna(0) + df['conservative'].fillna(0)
-        df['worst_case_complete'] = df['exact_amount'].fillna(0) + df['worst_case'].fillna(0)
-
-    
         st.write("")
         st.write("")
 
 
-        col1, col2 = st.columns(2)
-
-
-        with col1:
-            # pie chart exact amount
-            # Schritt 1: Aggregiere die exakten Werte nach Projekt
-            project_totals = df.groupby('project')['exact_amount'].sum().reset_index()
-
-            # Schritt 2: Sortiere die Projekte nach aggregierten Werten absteigend und berechne die Prozentsätze
-            total_exact_amount = project_totals['exact_amount'].sum()
-            project_totals['percentage'] = (project_totals['exact_amount'] / total_exact_amount) * 100
-            project_totals = project_totals.sort_values(by='exact_amount', ascending=False)
-
-            # Schritt 3: Ranke die Projekte basierend auf den aggregierten exakten Werten
-            project_totals['rank'] = project_totals['exact_amount'].rank(ascending=False, method='dense').astype(int)
-
-            # Schritt 4: Füge den einzelnen Einträgen im DataFrame das Ranking ihres Projekts hinzu
-            # Hier stellen wir sicher, dass 'rank' korrekt hinzugefügt wird.
-            df_ordered = pd.merge(df, project_totals[['project', 'rank']], on='project', how='left')
-
-            # Schritt 5: Sortiere die Einträge nach dem Rang ihres Projekts (höchstes Ranking zuerst)
-            df_ordered = df_ordered.sort_values(by=['rank', 'exact_amount'], ascending=[True, False])
+        # Darstellung der Kuchendiagramme: ein Segment pro Projekt (Standard) oder pro Eintrag
+        pie_mode = st.radio("Pie charts", ("Per project", "Per expense"), index=0, horizontal=True,
+                            help=f"Per expense shows at most {MAX_PIE_WEDGES} segments; the smallest expenses are grouped as \"{OTHER_LABEL}\".")
 
-            # Schritt 6: Erstelle das Piechart basierend auf der Reihenfolge der Projekte
-            fig_pie, ax_pie = plt.subplots(figsize=(10, 10))
-
-            # Pie chart für exact_amount, basierend auf dem Ranking der Projekte
-            df_ordered['exact_amount'] = df_ordered['exact_amount'].fillna(0)  # NaN zu 0 setzen
-            
-            if df_ordered['exact_amount'].sum() == 0:
-                st.write("No exact expenses available to display.")  # Falls keine Werte existieren
-                autotexts = []  # Verhindert den UnboundLocalError
+        # Kuchendiagramm eines Szenarios, Projekte nach ihrem Anteil sortiert (grösstes Projekt zuerst):
+        # (Werte, Farben, Legende, Titel) für charts.pie_pngs
+        def scenario_pie(column, title):
+            shares = scenario_shares(summary, column)
+            if pie_mode == "Per project":
+                values, projects = project_pie_wedges(summary, column)
             else:
-                wedges, texts, autotexts = ax_pie.pie(
-                    df_ordered['exact_amount'],
-                    labels=None,  
-                    colors=[get_color(project) for project in df_ordered['project']],  
-                    autopct=lambda p: f'{p:.1f}%' if p > 0 else '',  
-                    startangle=90,
-                    counterclock=False,
-                    wedgeprops={'edgecolor': 'grey', 'linewidth': 0.5}  
-                )
-            
-            # Verhindere Fehler, falls `autotexts` leer ist
-            if autotexts:
-                # Formatiere die Prozentwerte in den Segmenten (automatisch hinzugefügt)
-                for autotext in autotexts:
-                    autotext.set_color('black')  # Setze die Textfarbe auf Schwarz
-                    autotext.set_fontsize(10)    # Setze die Schriftgröße für bessere Lesbarkeit
-
-
-            # Definiere die Labels für die Legende (Projektname und Prozente)
-            legend_labels = [f"{row['project']}: {row['percentage']:.1f}%" for i, row in project_totals.iterrows()]
-
-            # Erstellen der Legende basierend auf dem Projekt-Ranking
-            handles = [mpatches.Patch(color=get_color(project), label=legend_labels[i]) for i, project in enumerate(project_totals['project'])]
-
-            # Platzierung der Legende
-            ax_pie.legend(handles, legend_labels, title="Projects", loc="upper right", frameon=True, fancybox=True, framealpha=1, facecolor='white')
-
-            # Titel und Ausrichtung des Kuchendiagramms
-            ax_pie.set_title("Share of Exact Expenses by Project", fontsize=20, fontweight='bold')
-            ax_pie.axis('equal')  # Sicherstellen, dass es ein Kreis bleibt
-
-            # Zeige das Kuchendiagramm in Streamlit an
-            st.pyplot(fig_pie)
-
-
-
-        
-        with col2:
-            # pie chart estimated amount
-            # Schritt 1: Aggregiere die geschätzten Werte nach Projekt
-            project_totals = df.groupby('project')['estimated_complete'].sum().reset_index()
-
-            # Schritt 2: Sortiere die Projekte nach aggregierten Werten absteigend und berechne die Prozentsätze
-            total_estimated = project_totals['estimated_complete'].sum()
-            project_totals['percentage'] = (project_totals['estimated_complete'] / total_estimated) * 100
-            project_totals = project_totals.sort_values(by='estimated_complete', ascending=False)
-
-            # Schritt 3: Ranke die Projekte basierend auf den aggregierten geschätzten Werten
-            project_totals['rank'] = project_totals['estimated_complete'].rank(ascending=False, method='dense').astype(int)
-
-            # Schritt 4: Sortiere den originalen DataFrame basierend auf der Reihenfolge der Projekte im 'project_totals'
-            df_ordered = pd.merge(df, project_totals[['project', 'rank']], on='project')
-            df_ordered = df_ordered.sort_values(by=['rank', 'estimated_complete'], ascending=[True, False])
-
-            # Schritt 5: Erstelle das Piechart basierend auf der Reihenfolge der Projekte
-            fig_pie, ax_pie = plt.subplots(figsize=(10, 10))
-
-            # Pie chart für estimated, basierend auf dem Ranking der Projekte
-            wedges, texts, autotexts = ax_pie.pie(
-                df_ordered['estimated_complete'],
-                labels=None,  # Keine Labels direkt an den Wedges
-                colors=[get_color(project) for project in df_ordered['project']],  # Verwende die get_color Funktion
-                autopct=lambda p: f'{p:.1f}%' if p > 0 else '',  # Zeige Prozentwerte für jedes Segment an
-                startangle=90,
-                counterclock=False,
-                wedgeprops={'edgecolor': 'grey', 'linewidth': 0.5}  # Dünne Linie trennt die Wedges
-            )
-
-            # Formatiere die Prozentwerte in den Segmenten (automatisch hinzugefügt)
-            for autotext in autotexts:
-                autotext.set_color('black')  # Setze die Textfarbe auf Schwarz
-                autotext.set_fontsize(10)    # Setze die Schriftgröße für bessere Lesbarkeit
-
-            # Definiere die Labels für die Legende (Projektname und Prozente)
-            legend_labels = [f"{row['project']}: {row['percentage']:.1f}%" for i, row in project_totals.iterrows()]
-
-            # Erstellen der Legende basierend auf dem Projekt-Ranking
-            handles = [mpatches.Patch(color=get_color(project), label=legend_labels[i]) for i, project in enumerate(project_totals['project'])]
-
-            # Platzierung der Legende
-            ax_pie.legend(handles, legend_labels, title="Projects", loc="upper right", frameon=True, fancybox=True, framealpha=1, facecolor='white')
-
-            # Titel und Ausrichtung des Kuchendiagramms
-            ax_pie.set_title("Share of Expenses by Project; scenario: estimated", fontsize=20, fontweight='bold')
-            ax_pie.axis('equal')  # Sicherstellen, dass es ein Kreis bleibt
-
-            # Zeige das Kuchendiagramm in Streamlit an
-            st.pyplot(fig_pie)
-
-
-
-        col1, col2 = st.columns(2)
-        with col1:
-            # pie chart conservative amount
-            # Schritt 1: Aggregiere die konservativen Werte nach Projekt
-            project_totals = df.groupby('project')['conservative_complete'].sum().reset_index()
-
-            # Schritt 2: Sortiere die Projekte nach aggregierten Werten absteigend und berechne die Prozentsätze
-            total_conservative = project_totals['conservative_complete'].sum()
-            project_totals['percentage'] = (project_totals['conservative_complete'] / total_conservative) * 100
-            project_totals = project_totals.sort_values(by='conservative_complete', ascending=False)
-
-            # Schritt 3: Ranke die Projekte basierend auf den aggregierten konservativen Werten
-            project_totals['rank'] = project_totals['conservative_complete'].rank(ascending=False, method='dense').astype(int)
-
-            # Schritt 4: Füge den einzelnen Einträgen im DataFrame das Ranking ihres Projekts hinzu
-            # Hier stellen wir sicher, dass 'rank' korrekt hinzugefügt wird.
-            df_ordered = pd.merge(df, project_totals[['project', 'rank']], on='project', how='left')
-
-            # Schritt 5: Sortiere die Einträge nach dem Rang ihres Projekts (höchstes Ranking zuerst)
-            df_ordered = df_ordered.sort_values(by=['rank', 'conservative_complete'], ascending=[True, False])
-
-            # Schritt 6: Erstelle das Piechart basierend auf der Reihenfolge der Projekte
-            fig_pie, ax_pie = plt.subplots(figsize=(10, 10))
-
-            # Pie chart für conservative, basierend auf dem Ranking der Projekte
-            wedges, texts, autotexts = ax_pie.pie(
-                df_ordered['conservative_complete'],
-                labels=None,  # Keine Labels direkt an den Wedges
-                colors=[get_color(project) for project in df_ordered['project']],  # Verwende die get_color Funktion
-                autopct=lambda p: f'{p:.1f}%' if p > 0 else '',  # Zeige Prozentwerte für jedes Segment an
-                startangle=90,
-                counterclock=False,
-                wedgeprops={'edgecolor': 'grey', 'linewidth': 0.5}  # Dünne Linie trennt die Wedges
-            )
-
-            # Formatiere die Prozentwerte in den Segmenten (automatisch hinzugefügt)
-            for autotext in autotexts:
-                autotext.set_color('black')  # Setze die Textfarbe auf Schwarz
-                autotext.set_fontsize(10)    # Setze die Schriftgröße für bessere Lesbarkeit
-
-            # Definiere die Labels für die Legende (Projektname und Prozente)
-            legend_labels = [f"{row['project']}: {row['percentage']:.1f}%" for i, row in project_totals.iterrows()]
+                values, projects = detail_pie_wedges(rows, summary, column)
 
-            # Erstellen der Legende basierend auf dem Projekt-Ranking
-            handles = [mpatches.Patch(color=get_color(project), label=legend_labels[i]) for i, project in enumerate(project_totals['project'])]
+            # Legende (Projektname und Prozente) in der Reihenfolge des Projekt-Rankings
+            legend = [(f"{project}: {percentage:.1f}%", color) for project, percentage, color
+                      in zip(shares['project'], shares['percentage'], project_registry.colors(shares['project']))]
+            colors = project_registry.colors(projects, special={OTHER_LABEL: OTHER_COLOR})
+            return values, colors, legend, title
 
-            # Platzierung der Legende
-            ax_pie.legend(handles, legend_labels, title="Projects", loc="upper right", frameon=True, fancybox=True, framealpha=1, facecolor='white')
 
-            # Titel und Ausrichtung des Kuchendiagramms
-            ax_pie.set_title("Share of Expenses by Project; scenario: conservative", fontsize=20, fontweight='bold')
-            ax_pie.axis('equal')  # Sicherstellen, dass es ein Kreis bleibt
+        pies = [
+            (scenario_pie('exact_amount', "Share of Exact Expenses by Project"), "No exact expenses available to display."),
+            (scenario_pie('estimated_complete', "Share of Expenses by Project; scenario: estimated"), "No expenses available to display."),
+            (scenario_pie('conservative_complete', "Share of Expenses by Project; scenario: conservative"), "No expenses available to display."),
+            (scenario_pie('worst_case_complete', "Share of Expenses by Project; scenario: worst case"), "No expenses available to display."),
+        ]
 
-            # Zeige das Kuchendiagramm in Streamlit an
-            st.pyplot(fig_pie)
-
-
-
-        with col2:
-            # pie chart worst case amount
-            # Schritt 1: Aggregiere die worst_case-Werte nach Projekt
-            project_totals = df.groupby('project')['worst_case_complete'].sum().reset_index()
-
-            # Schritt 2: Sortiere die Projekte nach aggregierten Werten absteigend und berechne die Prozentsätze
-            total_worst_case = project_totals['worst_case_complete'].sum()
-            project_totals['percentage'] = (project_totals['worst_case_complete'] / total_worst_case) * 100
-            project_totals = project_totals.sort_values(by='worst_case_complete', ascending=False)
-
-            # Schritt 3: Ranke die Projekte basierend auf den aggregierten worst_case-Werten
-            project_totals['rank'] = project_totals['worst_case_complete'].rank(ascending=False, method='dense').astype(int)
-
-            # Schritt 4: Füge den einzelnen Einträgen im DataFrame das Ranking ihres Projekts hinzu
-            # Hier stellen wir sicher, dass 'rank' korrekt hinzugefügt wird.
-            df_ordered = pd.merge(df, project_totals[['project', 'rank']], on='project', how='left')
-
-            # Schritt 5: Sortiere die Einträge nach dem Rang ihres Projekts (höchstes Ranking zuerst)
-            df_ordered = df_ordered.sort_values(by=['rank', 'worst_case_complete'], ascending=[True, False])
-
-            # Schritt 6: Erstelle das Piechart basierend auf der Reihenfolge der Projekte
-            fig_pie, ax_pie = plt.subplots(figsize=(10, 10))
-
-            # Pie chart für worst_case, basierend auf dem Ranking der Projekte
-            wedges, texts, autotexts = ax_pie.pie(
-                df_ordered['worst_case_complete'],
-                labels=None,  # Keine Labels direkt an den Wedges
-                colors=[get_color(project) for project in df_ordered['project']],  # Verwende die get_color Funktion
-                autopct=lambda p: f'{p:.1f}%' if p > 0 else '',  # Zeige Prozentwerte für jedes Segment an
-                startangle=90,
-                counterclock=False,
-                wedgeprops={'edgecolor': 'grey', 'linewidth': 0.5}  # Dünne Linie trennt die Wedges
-            )
-
-            # Formatiere die Prozentwerte in den Segmenten (automatisch hinzugefügt)
-            for autotext in autotexts:
-                autotext.set_color('black')  # Setze die Textfarbe auf Schwarz
-                autotext.set_fontsize(10)    # Setze die Schriftgröße für bessere Lesbarkeit
-
-            # Definiere die Labels für die Legende (Projektname und Prozente)
-            legend_labels = [f"{row['project']}: {row['percentage']:.1f}%" for i, row in project_totals.iterrows()]
-
-            # Erstellen der Legende basierend auf dem Projekt-Ranking
-            handles = [mpatches.Patch(color=get_color(project), label=legend_labels[i]) for i, project in enumerate(project_totals['project'])]
-
-            # Platzierung der Legende
-            ax_pie.legend(handles, legend_labels, title="Projects", loc="upper right", frameon=True, fancybox=True, framealpha=1, facecolor='white')
-
-            # Titel und Ausrichtung des Kuchendiagramms
-            ax_pie.set_title("Share of Expenses by Project; scenario: worst case", fontsize=20, fontweight='bold')
-            ax_pie.axis('equal')  # Sicherstellen, dass es ein Kreis bleibt
-
-            # Zeige das Kuchendiagramm in Streamlit an
-            st.pyplot(fig_pie)
+        # Alle vier gleichzeitig rastern (bzw. aus dem Cache nehmen), dann im Raster 2x2 anzeigen
+        pngs = pie_pngs([pie for pie, _ in pies])
+        for row_start in (0, 2):
+            for col, (pie, empty_message), png in zip(st.columns(2), pies[row_start:row_start + 2], pngs[row_start:row_start + 2]):
+                with col:
+                    if pie[0].sum() == 0:
+                        st.write(empty_message)  # Falls keine Werte existieren
+                    st.image(png, width="stretch")
 
 
 
@@ -1072,22 +620,11 @@ def app():
 
 
 
-        # Schritt 1: Erstelle eine vereinfachte Version des DataFrames für den Bubble Chart
-        bubble_df = df[['project', 'exact_amount', 'estimated', 'conservative', 'worst_case', 'priority']]
-
-        # Schritt 2: Berechne den Durchschnitt der Schätzungen pro Projekt (als Blasengröße)
-        bubble_df['average_cost'] = bubble_df[['exact_amount', 'estimated', 'conservative', 'worst_case']].mean(axis=1)
-
-        # Schritt 3: Aggregiere den DataFrame nach Projekt (falls es mehrere Einträge pro Projekt gibt)
-        bubble_df = bubble_df.groupby('project').agg({
-            'priority': 'mean',  # Falls Priorität mehrmals vergeben ist, nimm den Durchschnitt
-            'worst_case': 'sum',  # Worst-Case für das Risiko auf der Y-Achse
-            'average_cost': 'sum',  # Durchschnittliche Kosten für die Blasengröße
-            'exact_amount': 'sum',  # Exakte Ausgaben für die X-Achse
-            'estimated': 'sum'  # Optional für spätere Verwendung
-        }).reset_index()
+        # Bubble Chart direkt aus der Zusammenfassung: mittlere Priorität, Worst-Case-Summe und Summe der
+        # Durchschnittskosten (Blasengrösse) pro Projekt
+        bubble_df = summary[['project', 'priority', 'worst_case', 'average_cost', 'exact_amount', 'estimated']]
 
-        # Schritt 4: Erstelle den Bubble Chart mit Plotly Express
+        # Erstelle den Bubble Chart mit Plotly Express
         fig = px.scatter(
             bubble_df,
             x='priority',  # X-Achse: Priorität des Projekts
@@ -1104,7 +641,7 @@ def app():
             }
         )
 
-        # Schritt 5: Layout anpassen
+        # Layout anpassen
         fig.update_layout(
             xaxis_title='Project Priority',
             yaxis_title='Worst Case (CHF)',
@@ -1112,29 +649,17 @@ def app():
             width=900
         )
 
-        # Schritt 6: Zeige den Bubble Chart in Streamlit an
+        # Zeige den Bubble Chart in Streamlit an
         st.plotly_chart(fig)
 
 
 
 
 
-        # Schritt 1: Definiere die Gewichtung für jedes Szenario
-        weights = {
-            'estimated': 0.5,
-            'conservative': 0.3,
-            'worst_case': 0.2
-        }
-
-        # Schritt 2: Berechne den Weighted Average Risk Index (WARI) für jedes Projekt
-        df['WARI'] = (df['estimated'] * weights['estimated'] +
-                    df['conservative'] * weights['conservative'] +
-                    df['worst_case'] * weights['worst_case'])
+        # Weighted Average Risk Index (WARI) pro Projekt aus der Zusammenfassung (Gewichtung siehe insights.WARI_WEIGHTS)
+        wari_per_project = summary[['project', 'WARI']]
 
-        # Schritt 3: Aggregiere den WARI nach Projekt
-        wari_per_project = df.groupby('project')['WARI'].sum().reset_index()
-
-        # Schritt 4: Visualisiere den WARI pro Projekt in einem Balkendiagramm
+        # Visualisiere den WARI pro Projekt in einem Balkendiagramm
         fig = px.bar(
             wari_per_project,
             x='project',
@@ -1161,27 +686,20 @@ def app():
 
         
 
-    with tab3: 
+    if active_view == "Edit":
         st.header("Edit Expenses")
         st.write("")
 
+        # Meldung des letzten Speicherns/Löschens; sie überlebt den Rerun der ganzen App im Session-State
+        edit_message = st.session_state.pop("edit_message", None)
+        if edit_message:
+            st.success(edit_message)
+
 
-        # Funktion zum Ermitteln der nächsten freien ID
-        def get_next_id():
-            try:
-                response = table.scan(ProjectionExpression="id")
-                existing_ids = [int(item["id"]) for item in response.get("Items", []) if item["id"].isdigit()]
-                return str(max(existing_ids) + 1) if existing_ids else "1"
-            except Exception as e:
-                st.error(f"Error retrieving next ID: {e}")
-                return "1"
-        
         # Funktion zum Einfügen eines neuen Eintrags in DynamoDB
         def insert_expense(project, title, description, date, exact_amount, estimated, conservative, worst_case, priority, status="not assigned"):
             try:
-                expense_id = get_next_id()  # Neue ID berechnen
                 expense_item = {
-                    "id": expense_id,  # Fortlaufende ID statt UUID
                     "project": project,
                     "title": title,
                     "description": description,
@@ -1193,78 +711,85 @@ def app():
                     "priority": int(priority) if priority else None,
                     "status": status
                 }
-                table.put_item(Item=expense_item)
-                st.success(f"Expense successfully saved!")
-                if st.button("Refresh to view changes"):
-                    st.rerun()
+                # Fortlaufende ID aus dem atomaren Zähler, bedingter Put verhindert Überschreiben
+                create_expense(expense_item)
             except Exception as error:
                 st.error(f"Error saving expense: {error}")
+                return
+            # Die Tabelle und die Karten oben zeigen den neuen Eintrag erst nach einem Rerun der ganzen App
+            st.session_state["edit_message"] = "Expense successfully saved!"
+            st.rerun(scope="app")
                 
 
 
-        st.subheader("Enter an expense")
+        # Fragment: Eingaben im Formular laufen nur in diesem Bereich neu (nicht Login, Daten, Filter usw.);
+        # die Auswahl-Buttons blenden weiterhin sofort die passenden Felder ein
+        @st.fragment
+        def enter_expense():
+            st.subheader("Enter an expense")
 
-        # Dropdown für die Projektauswahl
-        project = st.selectbox(
-            "Select a project",
-            ["oikos Conference", "Sustainability Week", "Action Days", 
-            "Curriculum Change", "UN-DRESS", "ChangeHub", "oikos Solar", "oikos Catalyst", 
-            "Climate Neutral Events", "oikos Consulting", "Sustainable Finance", "Oismak"]
-        )
+            # Dropdown für die Projektauswahl
+            project = st.selectbox(
+                "Select a project",
+                project_registry.names
+            )
 
-        # Radiobutton für den Status (exklusiv für die Geschäftsleitung)
-        status = st.radio(
-            "Set the status of this expense:",
-            ("not assigned", "approved", "rejected")
-        )
+            # Radiobutton für den Status (exklusiv für die Geschäftsleitung)
+            status = st.radio(
+                "Set the status of this expense:",
+                ("not assigned", "approved", "rejected")
+            )
 
-        # Verwende einen Container für die Strukturierung
-        with st.container():
+            # Verwende einen Container für die Strukturierung
+            with st.container():
             
-            # Eingabe der Felder
-            title = st.text_input("Title of the expense (mandatory)")
-            description = st.text_input("Description (optional)")
+                # Eingabe der Felder
+                title = st.text_input("Title of the expense (mandatory)")
+                description = st.text_input("Description (optional)")
             
-            enter_date = st.radio("Is the expense associated with a specific date, and if so, is the date known?", 
-                                ("Not associated with a specific date", "specific date unknown", "specific date known"))
+                enter_date = st.radio("Is the expense associated with a specific date, and if so, is the date known?", 
+                                    ("Not associated with a specific date", "specific date unknown", "specific date known"))
 
-            if enter_date == "specific date known":
-                date = st.date_input("Enter the (first) date of the expense YYYY-MM-DD").strftime('%Y-%m-%d')  # Formatierung als String
-            elif enter_date == "specific date unknown":
-                date = "unknown"
-            else:
-                date = None
-
-        # Zweiter Container für Beträge
-        with st.container():
-            guaranteed_amount = st.radio("Is the amount of the expense guaranteed (there is a bill or binding offer) or does it have to be estimated?", 
-                                        ("Exact amount known", "Estimation"))
-
-            if guaranteed_amount == "Exact amount known":
-                exact_amount = st.number_input("Enter the exact amount of the expense in CHF")
-                estimated = None
-                conservative = None
-                worst_case = None
-            elif guaranteed_amount == "Estimation":
-                exact_amount = None
-                col1, col2, col3 = st.columns(3)  # Spalten für die geschätzten Beträge
-                with col1:
-                    estimated = st.number_input("Estimated amount in CHF")
-                with col2:
-                    conservative = st.number_input("Conservative estimate in CHF")
-                with col3:
-                    worst_case = st.number_input("Worst-case amount in CHF")
+                if enter_date == "specific date known":
+                    date = st.date_input("Enter the (first) date of the expense YYYY-MM-DD").strftime('%Y-%m-%d')  # Formatierung als String
+                elif enter_date == "specific date unknown":
+                    date = "unknown"
+                else:
+                    date = None
 
-        # Eingabe für Priorität
-        priority = st.number_input("Priority of the expense", min_value=1, max_value=5)
+            # Zweiter Container für Beträge
+            with st.container():
+                guaranteed_amount = st.radio("Is the amount of the expense guaranteed (there is a bill or binding offer) or does it have to be estimated?", 
+                                            ("Exact amount known", "Estimation"))
+
+                if guaranteed_amount == "Exact amount known":
+                    exact_amount = st.number_input("Enter the exact amount of the expense in CHF")
+                    estimated = None
+                    conservative = None
+                    worst_case = None
+                elif guaranteed_amount == "Estimation":
+                    exact_amount = None
+                    col1, col2, col3 = st.columns(3)  # Spalten für die geschätzten Beträge
+                    with col1:
+                        estimated = st.number_input("Estimated amount in CHF")
+                    with col2:
+                        conservative = st.number_input("Conservative estimate in CHF")
+                    with col3:
+                        worst_case = st.number_input("Worst-case amount in CHF")
+
+            # Eingabe für Priorität
+            priority = st.number_input("Priority of the expense", min_value=1, max_value=5)
+
+            # Submit-Button
+            if st.button("Submit"):
+                # Überprüfen, ob das Pflichtfeld Titel ausgefüllt ist
+                if title:
+                    insert_expense(project, title, description, date, exact_amount, estimated, conservative, worst_case, priority, status)
+                else:
+                    st.error("Title is a mandatory field!")
 
-        # Submit-Button
-        if st.button("Submit"):
-            # Überprüfen, ob das Pflichtfeld Titel ausgefüllt ist
-            if title:
-                insert_expense(project, title, description, date, exact_amount, estimated, conservative, worst_case, priority, status)
-            else:
-                st.error("Title is a mandatory field!")
+
+        enter_expense()
 
 
 
@@ -1274,65 +799,69 @@ def app():
         def delete_expense_by_id(expense_id):
             try:
                 expense_id_str = str(expense_id)  # Stelle sicher, dass die ID als String übergeben wird
-                table.delete_item(Key={"id": expense_id_str})
-                st.success(f"Expense successfully deleted!")
+                delete_expense(expense_id_str)  # Markiert den Eintrag als gelöscht (Tombstone)
             except Exception as error:
                 st.error(f"Error deleting expense: {error}")
-
-
-        # ID-Eingabefeld zum Löschen
-        st.write("")
-        st.subheader("Delete an expense")
-        expense_id_to_delete = st.number_input("Enter the ID of the expense you want to delete", step=1)
-
-        # Verwende Session-State, um den Zustand des überprüften Eintrags zu speichern
-        if "checked_expense" not in st.session_state:
-            st.session_state["checked_expense"] = None
-
-        # Button "Check" zur Überprüfung des Eintrags
-        if st.button("Check"):
-            if expense_id_to_delete:
-                try:
-                    expense_id_str = str(expense_id_to_delete)  # ID in String umwandeln
-                    response = table.get_item(Key={"id": expense_id_str})
-                    entry = response.get("Item")
+                return
+            st.session_state["checked_expense"] = None  # Eintrag aus Session-State löschen
+            st.session_state["edit_message"] = "Expense successfully deleted!"
+            st.rerun(scope="app")
+
+
+        # Fragment: Prüfen und Löschen laufen nur in diesem Bereich neu
+        @st.fragment
+        def delete_expense_section():
+            # ID-Eingabefeld zum Löschen
+            st.write("")
+            st.subheader("Delete an expense")
+            expense_id_to_delete = st.number_input("Enter the ID of the expense you want to delete", step=1)
+
+            # Verwende Session-State, um den Zustand des überprüften Eintrags zu speichern
+            if "checked_expense" not in st.session_state:
+                st.session_state["checked_expense"] = None
+
+            # Button "Check" zur Überprüfung des Eintrags
+            if st.button("Check"):
+                if expense_id_to_delete:
+                    try:
+                        expense_id_str = str(expense_id_to_delete)  # ID in String umwandeln
+                        entry = get_expense(expense_id_str)
         
-                    if entry:
-                        st.session_state["checked_expense"] = entry  # Speichere den Eintrag im Session-State
-                    else:
-                        st.error(f"No entry found with ID {expense_id_str}")
+                        if entry:
+                            st.session_state["checked_expense"] = entry  # Speichere den Eintrag im Session-State
+                        else:
+                            st.error(f"No entry found with ID {expense_id_str}")
         
-                except Exception as error:
-                    st.error(f"Error fetching expense: {error}")
+                    except Exception as error:
+                        st.error(f"Error fetching expense: {error}")
         
-        # Zeige den überprüften Eintrag an
-        if st.session_state["checked_expense"]:
-            entry = st.session_state["checked_expense"]
+            # Zeige den überprüften Eintrag an
+            if st.session_state["checked_expense"]:
+                entry = st.session_state["checked_expense"]
         
-            # Stelle sicher, dass der Key "project" existiert
-            project_name = entry.get("project", "Unknown")
-            color = get_color(project_name)
+                # Stelle sicher, dass der Key "project" existiert
+                project_name = entry.get("project", "Unknown")
+                color = project_registry.color(project_name)
         
-            container_content = f"""
-                <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
-                    <p><strong>ID: </strong>{entry["id"]}</p>
-                    <p><strong>Project: </strong>{entry["project"]}</p>
-                    <h4>{entry["title"]}</h4>
-                    <p>{entry["description"]}</p>
-                    <p><strong>Date: </strong>{entry["expense_date"]}</p>
-                    <p><strong>Amount: </strong>CHF {entry["exact_amount"] if entry["exact_amount"] is not None else f"{entry['estimated']} / {entry['conservative']} / {entry['worst_case']}"}</p>
-                    <p><strong>Priority: </strong>{entry["priority"]}</p>
-                </div>
-            """
-            st.markdown(container_content, unsafe_allow_html=True)
-        
-            # Button zum Löschen anzeigen
-            if st.button("Delete"):
-                delete_expense_by_id(expense_id_to_delete)
-                st.session_state["checked_expense"] = None  # Eintrag aus Session-State löschen
+                container_content = f"""
+                    <div style='background-color: {color}; padding: 15px; border-radius: 10px; margin-bottom: 10px;'>
+                        <p><strong>ID: </strong>{entry["id"]}</p>
+                        <p><strong>Project: </strong>{entry["project"]}</p>
+                        <h4>{entry["title"]}</h4>
+                        <p>{entry["description"]}</p>
+                        <p><strong>Date: </strong>{entry["expense_date"]}</p>
+                        <p><strong>Amount: </strong>CHF {entry["exact_amount"] if entry["exact_amount"] is not None else f"{entry['estimated']} / {entry['conservative']} / {entry['worst_case']}"}</p>
+                        <p><strong>Priority: </strong>{entry["priority"]}</p>
+                    </div>
+                """
+                st.markdown(container_content, unsafe_allow_html=True)
         
-                if st.button("Refresh to view changes"):
-                    st.rerun()
+                # Button zum Löschen anzeigen
+                if st.button("Delete"):
+                    delete_expense_by_id(expense_id_to_delete)
+
+
+        delete_expense_section()
 
 
 
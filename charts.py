@@ -0,0 +1,210 @@
+import os
+import atexit
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+
+
+# Szenarien des Balkendiagramms von hinten nach vorne: (Spalte der Zusammenfassung, Name, Farbe)
+BAR_SCENARIOS = [
+    ('worst_case_complete', 'Worst Case', '#FFB3B3'),  # Rot
+    ('conservative_complete', 'Conservative', '#FFD1A9'),  # Orange
+    ('estimated_complete', 'Estimated', '#FDE780'),  # Gelb
+    ('exact_amount', 'Exact', '#AAD4F4'),  # Blau
+]
+
+
+# Überlagertes Balkendiagramm "Expenses per project" aus der Projekt-Zusammenfassung (insights.project_summary).
+# Genau ein Trace pro Szenario mit allen Projekten; mit `show_sum` kommt die Zeile "Total Expenses" dazu.
+# plotly wird erst hier geladen, damit die Prozesse des Render-Pools (die dieses Modul importieren) nur
+# matplotlib und numpy laden.
+def expenses_per_project_chart(summary, show_sum=False):
+    import plotly.graph_objects as go
+
+    # Projekte nach der Worst-Case-Summe sortiert (kleinste unten)
+    grouped_df = summary.sort_values(by='worst_case_complete', ascending=True)
+    projects = grouped_df['project'].tolist()
+
+    fig = go.Figure()
+    for column, name, color in BAR_SCENARIOS:
+        values = grouped_df[column].tolist()
+        y = projects
+        if show_sum:
+            values = values + [grouped_df[column].sum()]
+            y = projects + ["Total Expenses"]
+        fig.add_trace(go.Bar(
+            x=values,
+            y=y,
+            orientation='h',
+            name=name,
+            marker=dict(color=color),
+            showlegend=show_sum,
+            hoverinfo="x"
+        ))
+
+    # Layout des Diagramms anpassen
+    fig.update_layout(
+        xaxis_title="CHF",
+        yaxis=dict(showticklabels=True),
+        barmode='overlay',  # Balken überlappen sich
+        height=600,
+        margin=dict(l=10, r=10, t=10, b=10)  # Reduziert die Ränder
+    )
+    return fig
+
+
+# Farbe des Sammelsegments "Other" im Detail-Modus der Kuchendiagramme
+OTHER_COLOR = "#D3D3D3"
+
+# Gleiche Einstellungen wie st.pyplot (scharf auf hochauflösenden Bildschirmen, Ränder abgeschnitten)
+CHART_DPI = 200
+# Anzahl Prozesse, die Kuchendiagramme parallel rastern (0 = im Script-Thread)
+CHART_WORKERS = int(os.getenv("OIKOS_CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Obergrenze für zwischengespeicherte PNGs in Bytes
+CHART_CACHE_BYTES = int(os.getenv("OIKOS_CHART_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+
+# LRU-Cache für gerenderte Diagramme, begrenzt durch die Summe der Bildgrössen statt durch die Anzahl
+class ByteLRUCache:
+    def __init__(self, max_bytes=CHART_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.items.get(key)
+            if data is not None:
+                self.items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self.lock:
+            if len(data) > self.max_bytes:
+                return
+            if key in self.items:
+                self.size -= len(self.items.pop(key))
+            self.items[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.items.popitem(last=False)
+                self.size -= len(evicted)
+
+
+chart_cache = ByteLRUCache()
+
+
+# Fingerabdruck der Daten, die in ein Diagramm einfliessen
+def chart_fingerprint(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Zeichnet ein Kuchendiagramm als PNG. Die Figure wird ohne pyplot erzeugt und gehört damit keinem
+# globalen Zustand; sie wird nach dem Speichern sofort wieder freigegeben. matplotlib wird erst hier
+# geladen (beim ersten Diagramm bzw. in den Prozessen des Render-Pools).
+def render_pie_png(values, colors, legend, title):
+    import matplotlib.patches as mpatches
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 10))
+    FigureCanvasAgg(fig)
+    try:
+        ax_pie = fig.subplots()
+
+        if values is not None and values.sum() > 0:
+            wedges, texts, autotexts = ax_pie.pie(
+                values,
+                labels=None,  # Keine Labels direkt an den Wedges
+                colors=colors,
+                autopct=lambda p: f'{p:.1f}%' if p > 0 else '',  # Zeige Prozentwerte für jedes Segment an
+                startangle=90,
+                counterclock=False,
+                wedgeprops={'edgecolor': 'grey', 'linewidth': 0.5}  # Dünne Linie trennt die Wedges
+            )
+
+            # Formatiere die Prozentwerte in den Segmenten (automatisch hinzugefügt)
+            for autotext in autotexts:
+                autotext.set_color('black')  # Setze die Textfarbe auf Schwarz
+                autotext.set_fontsize(10)    # Setze die Schriftgröße für bessere Lesbarkeit
+
+        # Legende mit Projektname und Prozenten in der Reihenfolge des Projekt-Rankings
+        legend_labels = [label for label, _ in legend]
+        handles = [mpatches.Patch(color=color, label=label) for label, color in legend]
+        ax_pie.legend(handles, legend_labels, title="Projects", loc="upper right", frameon=True, fancybox=True, framealpha=1, facecolor='white')
+
+        # Titel und Ausrichtung des Kuchendiagramms
+        ax_pie.set_title(title, fontsize=20, fontweight='bold')
+        ax_pie.axis('equal')  # Sicherstellen, dass es ein Kreis bleibt
+
+        output = BytesIO()
+        fig.savefig(output, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        return output.getvalue()
+    finally:
+        fig.clear()
+
+
+# Kuchendiagramm als PNG, für gleiche Daten aus dem Cache (wird nie zweimal gerastert)
+def pie_png(values, colors, legend, title):
+    return pie_pngs([(values, colors, legend, title)])[0]
+
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+# Prozess-Pool für das Rastern. matplotlib (Agg) ist nicht thread-safe, deshalb Prozesse statt Threads;
+# "spawn", weil der Streamlit-Server selbst mehrere Threads hat und ein fork dort nicht sicher ist.
+def get_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None and CHART_WORKERS > 1:
+            _render_pool = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_render_pool.shutdown, wait=False, cancel_futures=True)
+        return _render_pool
+
+
+def reset_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+# Mehrere Kuchendiagramme als PNG, Eingaben als (Werte, Farben, Legende, Titel). Was nicht im Cache ist, wird
+# gleichzeitig im Prozess-Pool gerastert; die Ergebnisse kommen in der Reihenfolge der Eingaben zurück.
+def pie_pngs(charts):
+    charts = [(np.asarray(values, dtype=float), list(colors), list(legend), title) for values, colors, legend, title in charts]
+    keys = [chart_fingerprint("pie", *chart) for chart in charts]
+    pngs = [chart_cache.get(key) for key in keys]
+    missing = [index for index, png in enumerate(pngs) if png is None]
+
+    pool = get_render_pool() if len(missing) > 1 else None
+    if pool is not None:
+        try:
+            futures = {index: pool.submit(render_pie_png, *charts[index]) for index in missing}
+            for index, future in futures.items():
+                pngs[index] = future.result()
+        except BrokenProcessPool:
+            reset_render_pool()  # z.B. ein abgestürzter Worker; beim nächsten Mal wird ein neuer Pool gestartet
+
+    for index in missing:
+        if pngs[index] is None:
+            pngs[index] = render_pie_png(*charts[index])
+        chart_cache.put(keys[index], pngs[index])
+    return pngs
@@ -0,0 +1,627 @@
+import os
+import time
+import threading
+
+import pandas as pd
+
+import numpy as np
+
+from storage import EXPENSE_COLUMNS, AMOUNT_COLUMNS, SYNC_COLUMNS, get_storage, items_to_columns
+from projects import project_registry
+
+try:
+    import pyarrow as pa
+except ImportError:  # Ohne pyarrow wird einfach kein lokaler Snapshot geschrieben
+    pa = None
+
+
+STRING_COLUMNS = ["id", "title", "description"]
+
+# Projekte, für die Ausgaben erfasst werden können (aus der Projekt-Registry, in Anzeigereihenfolge)
+PROJECTS = project_registry.names
+STATUSES = ["not assigned", "approved", "rejected"]
+
+# Aus expense_date abgeleitete Spalten, nur im Arbeitsspeicher: das Datum als datetime64 (NaT für "unknown",
+# fehlende und nicht lesbare Daten) und Flags für "unknown" bzw. kein Datum. expense_date selbst bleibt der
+# gespeicherte Text (als Categorical), damit Anzeige und Exporte nichts verlieren.
+DATE_COLUMNS = ["date_value", "date_unknown", "no_date"]
+DATE_DTYPE = "datetime64[s]"
+
+
+# Spalten des DataFrames zu gespeicherten Spalten (expense_date bringt seine abgeleiteten Spalten mit)
+def frame_columns(columns):
+    names = []
+    for col in columns:
+        names.append(col)
+        if col == "expense_date":
+            names.extend(DATE_COLUMNS)
+    return names
+
+
+# Feste Kategorien aus der bekannten Liste, ohne Gross-/Kleinschreibung sortiert: die Codes sind damit schon
+# die Sortierreihenfolge. Unbekannte Werte aus der Datenbank werden eingereiht statt verworfen.
+def category_dtype(known, values=()):
+    categories = set(known) | {value for value in values if isinstance(value, str)}
+    return pd.CategoricalDtype(sorted(categories, key=str.casefold))
+
+
+# Leerer DataFrame mit allen Spalten und den richtigen Typen
+def empty_expense_frame():
+    df = pd.DataFrame({col: pd.Series(dtype=object) for col in frame_columns(EXPENSE_COLUMNS + SYNC_COLUMNS)})
+    return df.astype({
+        **{col: "float64" for col in AMOUNT_COLUMNS},
+        "project": category_dtype(PROJECTS),
+        "status": category_dtype(STATUSES),
+        "expense_date": category_dtype(()),
+        "date_value": DATE_DTYPE,
+        "date_unknown": bool,
+        "no_date": bool,
+        "priority": "Int8",
+        "version": "Int64",
+    })
+
+
+# Textspalte als object-Spalte; fehlende Werte bleiben None, Nicht-Strings (z.B. Zahlen-IDs) werden zu str
+def to_string_column(values):
+    column = pd.Series(values, dtype=object)
+    if pd.api.types.infer_dtype(column, skipna=True) not in ("string", "empty"):
+        column = column.where(column.isna(), column.astype(str))
+    return column
+
+
+# Textspalte mit wenigen verschiedenen Werten als Categorical (ein Code pro Zeile statt eines Python-Strings).
+# Die Werte werden nur einmal faktorisiert; danach werden nur noch die wenigen Kategorien umsortiert.
+# `default` ersetzt fehlende Werte direkt über die Codes.
+def to_category_column(values, known=(), default=None):
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    if not all(isinstance(value, str) for value in uniques):
+        column = to_string_column(values)  # z.B. Zahlen statt Texte: erst einheitlich nach str
+        return column.fillna(default).astype(category_dtype(known, column.dropna().unique()))
+    dtype = category_dtype(known, uniques)
+    missing = -1 if default is None else dtype.categories.get_loc(default)
+    indexer = np.append(dtype.categories.get_indexer(uniques), missing)  # letzter Eintrag für Code -1 (fehlend)
+    return pd.Series(pd.Categorical.from_codes(indexer[codes], dtype=dtype))
+
+
+# Decimal-/String-Beträge in einem Schritt nach float64 (fehlende Werte werden NaN)
+def to_float_column(values):
+    column = pd.Series(values, dtype=object)
+    try:
+        return column.astype("float64")
+    except (TypeError, ValueError):
+        return pd.to_numeric(column, errors="coerce").astype("float64")
+
+
+# expense_date als Text (Categorical) plus die abgeleiteten Spalten aus DATE_COLUMNS. Geparst wird nur jeder
+# verschiedene Text einmal, die Zeilen bekommen ihr Datum über die Codes.
+def to_date_columns(values):
+    text = to_category_column(values)
+    categories = text.cat.categories
+    codes = text.cat.codes.to_numpy()
+    parsed = pd.to_datetime(pd.Series(categories, dtype=object), format="ISO8601", errors="coerce").astype(DATE_DTYPE)
+    dates = np.append(parsed.to_numpy(), np.datetime64("NaT", "s"))[codes]  # Code -1 (kein Datum) = NaT
+    unknown_code = categories.get_loc("unknown") if "unknown" in categories else -2
+    return {"expense_date": text, "date_value": dates, "date_unknown": codes == unknown_code, "no_date": codes == -1}
+
+
+# Wandelt Items (DynamoDB oder Datenbankzeilen) spaltenweise in einen DataFrame mit einheitlichen Spalten und Typen um
+def items_to_dataframe(items):
+    # Spalten direkt aus der Item-Liste aufbauen (ein Durchlauf pro Spalte statt Konvertierung pro Zeile)
+    return columns_to_dataframe(items_to_columns(items, EXPENSE_COLUMNS + SYNC_COLUMNS))
+
+
+# Typ einer einzelnen Spalte vereinheitlichen (expense_date siehe to_date_columns)
+def convert_column(col, values):
+    if col in AMOUNT_COLUMNS:
+        return to_float_column(values)
+    if col == "priority":
+        # Prioritäten gehen von 1 bis 5 und passen in Int8; abweichende Werte aus der Datenbank bleiben erhalten
+        priority = to_float_column(values)
+        present = priority.to_numpy()[priority.notna().to_numpy()]
+        fits = present.size == 0 or (present.min() >= -128 and present.max() <= 127)
+        return priority.astype("Int8" if fits else "Int64")
+    if col == "version":
+        return to_float_column(values).astype("Int64")  # Int64 erlaubt auch NaN
+    if col == "project":
+        return to_category_column(values, PROJECTS)
+    if col == "status":
+        # Standardwert für den Status in einem Schritt setzen
+        return to_category_column(values, STATUSES, default="not assigned")
+    return to_string_column(values)
+
+
+# Baut den DataFrame aus {Spalte: Liste von Werten}
+def columns_to_dataframe(columns):
+    # Falls die Tabelle leer ist, gib einen leeren DataFrame zurück
+    if not columns["id"]:
+        return empty_expense_frame()
+
+    frame = {}
+    for col in EXPENSE_COLUMNS + SYNC_COLUMNS:
+        if col == "expense_date":
+            frame.update(to_date_columns(columns[col]))
+        else:
+            frame[col] = convert_column(col, columns[col])
+    return pd.DataFrame(frame, copy=False)  # die Spalten sind frisch erzeugt, eine Kopie ist unnötig
+
+
+# Nach einem concat mit abweichenden Kategorien (z.B. ein neues Projekt) sind die Spalten wieder object
+def restore_categories(df):
+    for col, known in (("project", PROJECTS), ("status", STATUSES), ("expense_date", ())):
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(category_dtype(known, df[col].dropna().unique()))
+    return df
+
+
+# Darstellung wie in der Datenbank (Texte statt Kategorien, fehlende Werte als None, ohne abgeleitete Spalten),
+# für die Tabelle, die Karten und die Exporte
+def readable_frame(df):
+    readable = df.drop(columns=DATE_COLUMNS, errors="ignore")
+    for col in ("project", "status", "expense_date"):
+        if col in readable:
+            column = readable[col].astype(object)
+            readable[col] = column.where(column.notna(), None)
+    return readable
+
+
+# Liest alle nicht gelöschten Einträge aus dem Speicher-Backend und baut den Expense-DataFrame
+def load_expenses():
+    return columns_to_dataframe(get_storage().scan_columns())
+
+
+# Delta-Sync: jeder Schreibzugriff setzt einen monoton steigenden Zeitstempel `updated_at` (ms) und
+# erhöht `version`; gelöschte Einträge bleiben als Tombstone (`deleted`) stehen.
+# Überlappung beim Abfragen, damit Schreibzugriffe von Servern mit leicht abweichender Uhr nicht verloren gehen
+SYNC_OVERLAP_MS = 5000
+
+
+# Liest alle Einträge (inkl. Tombstones), die seit `since` (ms) geändert wurden
+def load_changes(since):
+    return get_storage().scan_changes(since)
+
+
+# Speichert einen neuen Eintrag unter einer fortlaufenden ID und übernimmt ihn direkt in den Snapshot
+def create_expense(item):
+    item = get_storage().insert(item)
+    expense_snapshot.apply_changes([item])
+    return item
+
+
+# Aktualisiert den Status eines Eintrags und gibt das vollständige neue Item zurück
+def update_expense_status(expense_id, new_status):
+    item = get_storage().update_status(expense_id, new_status)
+    expense_snapshot.apply_changes([item])
+    return item
+
+
+# Setzt den Status mehrerer Einträge in einem Batch. Der Snapshot wird vorab optimistisch angepasst,
+# damit alle Sessions die Änderung sofort sehen; schlägt das Speichern fehl, wird er neu geladen.
+def update_expense_statuses(expense_ids, new_status):
+    if not expense_ids:
+        return []
+    expense_snapshot.set_status(expense_ids, new_status)
+    try:
+        items = get_storage().update_status_many(expense_ids, new_status)
+    except Exception:
+        expense_snapshot.invalidate()
+        raise
+    expense_snapshot.apply_changes(items)
+    return items
+
+
+# Löscht einen Eintrag, indem er als Tombstone markiert wird, damit andere Prozesse die Löschung im Delta sehen
+def delete_expense(expense_id):
+    item = get_storage().delete(expense_id)
+    expense_snapshot.apply_changes([item])
+    return item
+
+
+# Einzelnen Eintrag lesen; Tombstones gelten als nicht vorhanden
+def get_expense(expense_id):
+    item = get_storage().get(expense_id)
+    if item is None or item.get("deleted"):
+        return None
+    return item
+
+
+# Lokale Snapshot-Datei (Arrow IPC, unkomprimiert) für schnelle Neustarts. Sie enthält den
+# normalisierten DataFrame und das Sync-Watermark; beim Start wird sie per Memory-Mapping gelesen
+# und nur noch das Delta seit dem Watermark aus dem Speicher-Backend geholt.
+SNAPSHOT_PATH = os.getenv("OIKOS_SNAPSHOT_PATH", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".cache", f"expenses-{os.getenv('OIKOS_STORAGE', 'dynamodb')}.arrow"
+))
+
+
+# Für flüchtige Backends (SQLite im Arbeitsspeicher) wäre eine Datei nach dem Neustart falsch
+def snapshot_file_enabled(path):
+    return pa is not None and bool(path) and get_storage().is_persistent
+
+
+def write_snapshot_file(df, watermark, full_load_at, path=SNAPSHOT_PATH):
+    if not snapshot_file_enabled(path):
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        arrow_table = arrow_table.replace_schema_metadata({
+            **(arrow_table.schema.metadata or {}),
+            b"watermark": str(watermark).encode(),
+            b"full_load_at": str(full_load_at).encode(),
+        })
+
+        # Erst in eine temporäre Datei schreiben und dann atomar ersetzen, damit nie eine halbe Datei gelesen wird
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException):
+        pass  # Die Datei ist nur ein Cache, das Speicher-Backend bleibt die Quelle
+
+
+# Gibt (DataFrame, Watermark, Zeitpunkt des letzten vollständigen Scans) zurück oder None
+def read_snapshot_file(path=SNAPSHOT_PATH):
+    if not snapshot_file_enabled(path) or not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path) as source:
+            arrow_table = pa.ipc.open_file(source).read_all()
+            metadata = arrow_table.schema.metadata or {}
+            df = arrow_table.to_pandas()
+        df = restore_categories(df[frame_columns(EXPENSE_COLUMNS + SYNC_COLUMNS)].astype({col: object for col in STRING_COLUMNS}))
+        return df, int(metadata[b"watermark"]), int(metadata[b"full_load_at"])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+# Gültigkeitsdauer des gemeinsamen Snapshots in Sekunden; danach wird die Tabelle vollständig neu gelesen
+CACHE_TTL = float(os.getenv("OIKOS_CACHE_TTL", "3600"))
+# Abstand in Sekunden, in dem Änderungen anderer Prozesse per Delta-Sync nachgeladen werden
+SYNC_INTERVAL = float(os.getenv("OIKOS_SYNC_INTERVAL", "10"))
+
+
+# Prozessweiter Snapshot der Expense-Tabelle, den sich alle Streamlit-Sessions teilen.
+# Schreibzugriffe aus dieser App werden direkt übernommen, Änderungen anderer Prozesse
+# kommen über den Delta-Sync seit dem letzten Watermark dazu.
+class ExpenseSnapshot:
+    def __init__(self, ttl=CACHE_TTL, sync_interval=SYNC_INTERVAL, snapshot_path=SNAPSHOT_PATH):
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.snapshot_path = snapshot_path
+        self.df = None
+        self.restore_attempted = False
+        self.loaded_at = 0.0
+        self.synced_at = 0.0
+        self.watermark = 0
+        self.full_load_at = 0
+        # Anzahl Einträge pro Projekt/Status aus dem letzten Snapshot, für die Abschätzung im Query-Planer
+        self.project_counts = None
+        self.status_counts = None
+        # Ergebnisse gefilterter Queries, solange kein vollständiger Snapshot geladen ist
+        self.query_cache = {}
+        # Filter-Bitmaps zum aktuellen Stand von `df`, erst bei der ersten gefilterten Abfrage aufgebaut
+        self.bitmaps = None
+        # Vorsortierte Permutationen für die Sortieroptionen, bei Änderungen inkrementell nachgeführt
+        self.sort_index = None
+        self.lock = threading.RLock()
+
+    def is_fresh(self):
+        return self.df is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    # Gibt eine Kopie des Snapshots zurück; lädt nur, wenn er fehlt oder abgelaufen ist, sonst höchstens ein Delta.
+    # Mit `filters` und `sort_by` (siehe SORT_KEYS) werden die passenden Zeilen in der gewünschten
+    # Reihenfolge in einem einzigen Schritt herausgeschnitten.
+    def get(self, filters=None, sort_by=None):
+        with self.lock:
+            if self.df is None and self.restore_once():
+                self.sync()
+            elif not self.is_fresh():
+                self.reload()
+            elif time.monotonic() - self.synced_at >= self.sync_interval:
+                self.sync()
+
+            mask = self.filter_bitmaps().mask(filters) if filters is not None else None
+            if sort_by is not None:
+                rows = self.sorted_rows(sort_by)
+                if mask is not None:
+                    rows = rows[mask[rows]]
+            else:
+                rows = np.flatnonzero(mask) if mask is not None else None
+            if rows is None:
+                return self.df.copy()
+            return self.df.iloc[rows]
+
+    def sorted_rows(self, sort_by):
+        with self.lock:
+            if self.sort_index is None:
+                self.sort_index = SortIndex()
+            return self.sort_index.permutation(self.df, sort_by)
+
+    def filter_bitmaps(self):
+        with self.lock:
+            if self.bitmaps is None:
+                self.bitmaps = FilterBitmaps(self.df)
+            return self.bitmaps
+
+    def reload(self):
+        with self.lock:
+            started_at = time.time_ns() // 1_000_000
+            self.df = load_expenses()
+            self.bitmaps = self.sort_index = None
+            self.update_counts()
+            self.watermark = self.full_load_at = started_at
+            self.loaded_at = self.synced_at = time.monotonic()
+            write_snapshot_file(self.df, self.watermark, self.full_load_at, self.snapshot_path)
+
+    # Übernimmt die lokale Snapshot-Datei nach einem Neustart, sofern der letzte vollständige Scan noch innerhalb der TTL liegt
+    def restore(self):
+        with self.lock:
+            snapshot = read_snapshot_file(self.snapshot_path)
+            if snapshot is None:
+                return False
+            df, watermark, full_load_at = snapshot
+            age = (time.time_ns() // 1_000_000 - full_load_at) / 1000
+            if not 0 <= age < self.ttl:
+                return False
+            self.df, self.watermark, self.full_load_at = df, watermark, full_load_at
+            self.bitmaps = self.sort_index = None
+            self.update_counts()
+            self.loaded_at = time.monotonic() - age
+            return True
+
+    # Die lokale Datei nur beim ersten Zugriff lesen; danach gilt der Snapshot im Arbeitsspeicher
+    def restore_once(self):
+        with self.lock:
+            if self.df is not None:
+                return True
+            if self.restore_attempted:
+                return False
+            self.restore_attempted = True
+            return self.restore()
+
+    # Holt nur die seit dem Watermark geänderten Einträge und führt sie in den Snapshot ein
+    def sync(self):
+        with self.lock:
+            started_at = time.time_ns() // 1_000_000
+            changes = load_changes(self.watermark - SYNC_OVERLAP_MS)
+            self.apply_changes(changes)
+            self.watermark = started_at
+            self.synced_at = time.monotonic()
+            if changes:
+                write_snapshot_file(self.df, self.watermark, self.full_load_at, self.snapshot_path)
+
+    def update_counts(self):
+        # value_counts() eines Categoricals enthält auch Kategorien ohne Einträge
+        project_counts = self.df["project"].value_counts()
+        status_counts = self.df["status"].value_counts()
+        self.project_counts = project_counts[project_counts > 0].to_dict()
+        self.status_counts = status_counts[status_counts > 0].to_dict()
+
+    # Gefilterte Einträge direkt aus der Datenbank, pro Filter für kurze Zeit zwischengespeichert
+    def query(self, filters):
+        with self.lock:
+            cached = self.query_cache.get(filters)
+            if cached is None or time.monotonic() - cached[1] >= self.sync_interval:
+                cached = (items_to_dataframe(get_storage().query(filters)), time.monotonic())
+                self.query_cache[filters] = cached
+            return cached[0].copy()
+
+    # Geschätzter Anteil der Tabelle, den ein Filter liefert (Projekt- bzw. Statusauswahl)
+    def estimate_coverage(self, filters):
+        if filters.projects is not None:
+            selected, counts, known = filters.projects, self.project_counts, PROJECTS
+        elif filters.statuses is not None:
+            selected, counts, known = filters.statuses, self.status_counts, STATUSES
+        else:
+            return 1.0
+        if counts:
+            return sum(counts.get(value, 0) for value in selected) / max(sum(counts.values()), 1)
+        return len(selected) / len(known)
+
+    # Übernimmt geänderte Items (neue, geänderte und Tombstones); ältere Versionen werden ignoriert
+    def apply_changes(self, items):
+        with self.lock:
+            if items:
+                self.query_cache.clear()
+            if self.df is None or not items:
+                return
+
+            changes = items_to_dataframe(items)
+            changes["deleted"] = [bool(item.get("deleted")) for item in items]
+            changes = changes.drop_duplicates("id", keep="last")
+
+            current_versions = changes["id"].map(self.df.set_index("id")["version"])
+            is_newer = current_versions.isna() | (changes["version"].fillna(0) >= current_versions.fillna(0))
+            changes = changes[is_newer.to_numpy(dtype=bool)]
+
+            removed = self.df["id"].isin(changes["id"]).to_numpy()
+            df = self.df[~removed]
+            added = changes.loc[~changes["deleted"], frame_columns(EXPENSE_COLUMNS + SYNC_COLUMNS)]
+            self.df = restore_categories(pd.concat([df, added], ignore_index=True)) if not added.empty else df.reset_index(drop=True)
+            self.bitmaps = None
+            # Zähler nachführen, damit neue Projekte sofort in den Filtern (known_projects) erscheinen
+            self.update_counts()
+            # Die Sortierung bleibt gültig: entfernte Zeilen fallen heraus, neue (ans Ende angehängte) werden eingefügt
+            if self.sort_index is not None:
+                self.sort_index.update(removed, self.df)
+
+    # Optimistische Statusänderung ohne Datenbankzugriff; die gespeicherten Items (mit neuer Version) folgen über apply_changes
+    def set_status(self, expense_ids, new_status):
+        with self.lock:
+            if self.df is None:
+                return
+            self.df.loc[self.df["id"].isin([str(expense_id) for expense_id in expense_ids]), "status"] = new_status
+            self.query_cache.clear()
+            self.update_counts()
+            self.bitmaps = None
+
+    def invalidate(self):
+        with self.lock:
+            self.df = None
+            self.bitmaps = self.sort_index = None
+
+
+expense_snapshot = ExpenseSnapshot()
+
+
+# Alle Expenses aus dem gemeinsamen Snapshot (ohne Datenbankzugriff, solange er gültig ist).
+# Mit `filters` nur die passenden Einträge (über die Filter-Bitmaps des Snapshots), mit `sort_by` sortiert.
+def get_expenses(filters=None, sort_by=None):
+    return expense_snapshot.get(filters, sort_by)
+
+
+# Clientseitige Filterung mit derselben Bedeutung wie ExpenseFilter. Pro Filterwert (Projekt, Status, Priorität,
+# Datumsklasse, Betragsart) gibt es eine Bitmap mit einem Bit pro Zeile, einmal pro Datenstand des Snapshots
+# aufgebaut. Eine Auswahl ist dann nur noch OR innerhalb und AND zwischen den Filtern; der DataFrame wird
+# danach ein einziges Mal mit den Zeilennummern herausgeschnitten.
+class FilterBitmaps:
+    def __init__(self, df):
+        self.size = len(df)
+        self.empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.bitmaps = {}
+        for dimension, col in (("projects", "project"), ("statuses", "status")):
+            if col in df:
+                codes = df[col].cat.codes.to_numpy()
+                self.bitmaps[dimension] = {value: np.packbits(codes == code) for code, value in enumerate(df[col].cat.categories)}
+        if "priority" in df:
+            priority = df["priority"].to_numpy(dtype=float, na_value=np.nan)
+            self.bitmaps["priorities"] = {int(value): np.packbits(priority == value) for value in np.unique(priority[~np.isnan(priority)])}
+        if "no_date" in df:
+            no_date, unknown = df["no_date"].to_numpy(), df["date_unknown"].to_numpy()
+            self.bitmaps["date_classes"] = {"no_date": np.packbits(no_date), "unknown": np.packbits(unknown),
+                                            "date": np.packbits(~no_date & ~unknown)}
+        if "exact_amount" in df:
+            has_exact = df["exact_amount"].notna().to_numpy()
+            self.bitmaps["amount_types"] = {"exact": np.packbits(has_exact), "estimated": np.packbits(~has_exact)}
+
+    # Auswahl als boolesche Maske, None falls kein Filter einschränkt
+    def mask(self, filters):
+        result = None
+        for dimension in ("projects", "statuses", "priorities", "date_classes", "amount_types"):
+            values = getattr(filters, dimension)
+            if values is None:
+                continue
+            bitmaps = self.bitmaps[dimension]
+            selected = self.empty.copy()
+            for value in values:
+                if value in bitmaps:
+                    np.bitwise_or(selected, bitmaps[value], out=selected)
+            result = selected if result is None else np.bitwise_and(result, selected, out=result)
+        if result is None:
+            return None
+        return np.unpackbits(result, count=self.size).view(bool)
+
+
+# Sortieroptionen: Spalte, nach der sortiert wird (die Reihenfolge ist immer aufsteigend)
+SORT_KEYS = ("id", "project", "priority", "expense_date")
+# Schlüssel für fehlende Werte; sie kommen ans Ende
+LAST_KEY = np.iinfo(np.int64).max
+
+
+# Sortierschlüssel als int64 pro Zeile:
+# - id numerisch ("2" vor "10"); nicht-numerische IDs kommen ans Ende
+# - project nach den Codes (die Kategorien sind ohne Gross-/Kleinschreibung sortiert, siehe category_dtype)
+# - priority aufsteigend, ohne Priorität am Ende
+# - expense_date aufsteigend, danach "unknown" und nicht lesbare Daten und zuletzt Einträge ohne Datum
+def sort_key(df, sort_by):
+    if sort_by == "id":
+        values = pd.to_numeric(df["id"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    elif sort_by == "project":
+        codes = df["project"].cat.codes.to_numpy()
+        return np.where(codes >= 0, codes, LAST_KEY).astype(np.int64)
+    elif sort_by == "priority":
+        values = df["priority"].to_numpy(dtype=float, na_value=np.nan)
+    elif sort_by == "expense_date":
+        dates = df["date_value"].to_numpy()
+        keys = dates.astype(np.int64)
+        keys[np.isnat(dates)] = LAST_KEY - 1
+        keys[df["no_date"].to_numpy()] = LAST_KEY
+        return keys
+    else:
+        raise ValueError(f"Unknown sort key: {sort_by}")
+    keys = np.full(len(values), LAST_KEY, dtype=np.int64)
+    present = ~np.isnan(values)
+    keys[present] = values[present]
+    return keys
+
+
+# Stabil sortierte Zeilennummern eines DataFrames (gleiche Schlüssel behalten ihre Reihenfolge)
+def sort_rows(df, sort_by):
+    return np.argsort(sort_key(df, sort_by), kind="stable")
+
+
+# DataFrame ohne Snapshot sortieren (z.B. Ergebnisse gezielter Queries), gleiche Reihenfolge wie SortIndex
+def sort_frame(df, sort_by):
+    return df.iloc[sort_rows(df, sort_by)]
+
+
+# Vorsortierte Permutationen eines Snapshots, eine pro Sortieroption, mit den sortierten Schlüsseln.
+# Eine Sortierung ist damit nur noch ein Gather über die Permutation. Bei Änderungen wird nicht neu
+# sortiert: entfernte Zeilen fallen heraus, neue Zeilen werden per Binärsuche eingefügt.
+class SortIndex:
+    def __init__(self):
+        self.orders = {}
+        self.project_categories = None
+
+    def permutation(self, df, sort_by):
+        if sort_by not in self.orders:
+            keys = sort_key(df, sort_by)
+            permutation = np.argsort(keys, kind="stable")
+            self.orders[sort_by] = (permutation, keys[permutation])
+            if sort_by == "project":
+                self.project_categories = df["project"].cat.categories
+        return self.orders[sort_by][0]
+
+    # `removed` markiert die entfernten Zeilen des alten DataFrames; `df` enthält die übrigen Zeilen in
+    # derselben Reihenfolge und danach die neuen (wie in ExpenseSnapshot.apply_changes)
+    def update(self, removed, df):
+        kept = len(removed) - int(removed.sum())
+        new_positions = np.cumsum(~removed) - 1
+        added = np.arange(kept, len(df))
+
+        # Neue Projekt-Kategorien verschieben die Codes; diese Sortierung wird beim nächsten Zugriff neu aufgebaut
+        if "project" in self.orders and not df["project"].cat.categories.equals(self.project_categories):
+            del self.orders["project"]
+
+        for sort_by, (permutation, sorted_keys) in self.orders.items():
+            still_there = ~removed[permutation]
+            permutation, sorted_keys = new_positions[permutation[still_there]], sorted_keys[still_there]
+            if len(added):
+                added_keys = sort_key(df.iloc[kept:], sort_by)
+                order = np.argsort(added_keys, kind="stable")
+                at = np.searchsorted(sorted_keys, added_keys[order], side="right")
+                permutation = np.insert(permutation, at, added[order])
+                sorted_keys = np.insert(sorted_keys, at, added_keys[order])
+            self.orders[sort_by] = (permutation, sorted_keys)
+
+
+# Anteil der Tabelle, ab dem statt gezielter Queries der ganze Snapshot geladen wird
+QUERY_COVERAGE_THRESHOLD = float(os.getenv("OIKOS_QUERY_COVERAGE", "0.5"))
+
+
+# Entscheidet, wie eine gefilterte Ansicht geladen wird: aus dem Snapshot ("snapshot") oder per Query
+# nur mit den passenden Einträgen ("query"). Ein gültiger Snapshot kostet keine Lesezugriffe und wird
+# immer bevorzugt; ohne Snapshot lohnt sich die Query nur für schmale Auswahlen.
+def plan_query(filters):
+    if expense_snapshot.is_fresh():
+        return "snapshot"
+    if filters.projects is None and filters.statuses is None:
+        return "snapshot"
+    if expense_snapshot.estimate_coverage(filters) >= QUERY_COVERAGE_THRESHOLD:
+        return "snapshot"
+    return "query"
+
+
+# Gefilterte Expenses gemäss Query-Plan, mit `sort_by` (siehe SORT_KEYS) sortiert
+def get_filtered_expenses(filters, sort_by=None):
+    if plan_query(filters) == "query":
+        df = expense_snapshot.query(filters)
+        return sort_frame(df, sort_by) if sort_by is not None else df
+    return get_expenses(filters, sort_by)
+
+
+# Projekte für die Filter-Checkboxen: die im Snapshot vorhandenen, sonst die bekannte Projektliste
+def known_projects():
+    counts = expense_snapshot.project_counts
+    if not counts:
+        return list(PROJECTS)
+    return [project for project in PROJECTS if project in counts] + sorted(project for project in counts if project not in PROJECTS)
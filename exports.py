@@ -0,0 +1,166 @@
+import os
+import hashlib
+import tempfile
+import threading
+import importlib.util
+from collections import OrderedDict
+
+import pandas as pd
+
+from expenses import readable_frame
+
+
+# Exporte werden in eine temporäre Datei geschrieben, die erst ab dieser Grösse auf die Festplatte ausgelagert wird
+SPOOL_MAX_SIZE = int(os.getenv("OIKOS_EXPORT_SPOOL_SIZE", str(8 * 1024 * 1024)))
+# Zeilen pro Block beim Schreiben; begrenzt den zusätzlichen Speicher unabhängig von der Anzahl Expenses
+EXPORT_CHUNK_ROWS = 10_000
+# Anzahl fertiger Exporte, die im Prozess zwischengespeichert werden, und maximale Grösse eines solchen Exports
+EXPORT_CACHE_SIZE = 8
+EXPORT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# xlsxwriter und pyarrow werden erst beim ersten Export geladen; ohne pyarrow gibt es keinen Parquet-Export
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+# Inhalts-Hash eines DataFrames (Werte und Spaltennamen); gleiche Daten ergeben denselben Export
+def dataframe_hash(df):
+    digest = hashlib.sha1()
+    digest.update("\0".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+# Übersicht pro Projekt mit einem einzigen groupby (Reihenfolge wie im DataFrame)
+def project_overview(df):
+    exact_amount = df['exact_amount']
+    overview = df.assign(
+        has_exact=exact_amount > 0,  # Einträge mit exact_amount grösser als 0
+        no_exact=exact_amount.isna() | (exact_amount == 0),  # Einträge ohne exact_amount (nur Schätzungen)
+    ).groupby('project', sort=False).agg(**{
+        'Registered Expenses': ('project', 'size'),
+        'Exact Expenses': ('has_exact', 'sum'),
+        'Total Exact Expenses': ('exact_amount', 'sum'),
+        'Estimated Expenses': ('no_exact', 'sum'),
+        'Total Estimated': ('estimated', 'sum'),
+        'Total Conservatively Estimated': ('conservative', 'sum'),
+        'Total Worst Case': ('worst_case', 'sum'),
+    })
+    return overview.rename_axis('Projekt').reset_index()
+
+
+def spooled_file():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+
+# Zeilen als Tupel von Python-Werten, blockweise umgewandelt; fehlende Werte werden None (leere Zelle)
+def iter_rows(df):
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+        yield from chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+# Schreibt ein Tabellenblatt Zeile für Zeile (im constant_memory-Modus wird jede fertige Zeile sofort ausgelagert)
+def write_sheet(workbook, sheet_name, df, header_format):
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+    for row_num, row in enumerate(iter_rows(df), start=1):
+        worksheet.write_row(row_num, 0, row)
+    return worksheet
+
+
+# Excel-Datei mit dem Overview-Tabellenblatt zuerst und danach einem Blatt pro Projekt (jedes genau einmal geschrieben).
+# xlsxwriter läuft im constant_memory-Modus und schreibt in eine temporäre Datei, damit der Speicherbedarf
+# nicht mit der Anzahl Zellen wächst.
+def create_excel_with_overview(df):
+    import xlsxwriter
+
+    output = spooled_file()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    try:
+        # Überschrift formatieren
+        overview_header_format = workbook.add_format({
+            'bold': True,
+            'text_wrap': True,
+            'valign': 'top',
+            'fg_color': '#D7E4BC',
+            'border': 1
+        })
+        header_format = workbook.add_format({'bold': True, 'border': 1})
+
+        write_sheet(workbook, 'Overview', project_overview(df), overview_header_format)
+        for project, df_project in df.groupby('project', sort=False):
+            write_sheet(workbook, project, df_project, header_format)
+    finally:
+        workbook.close()
+
+    output.seek(0)
+    return output
+
+
+# CSV in Blöcken zu EXPORT_CHUNK_ROWS Zeilen, damit nie der ganze Text auf einmal im Speicher liegt
+def create_csv(df):
+    output = spooled_file()
+    if df.empty:
+        output.write(df.to_csv(index=False).encode("utf-8"))
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        output.write(df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(index=False, header=start == 0).encode("utf-8"))
+    output.seek(0)
+    return output
+
+
+# Parquet mit einer Row Group pro Block; das Schema wird einmal aus dem ganzen DataFrame abgeleitet,
+# damit Blöcke mit nur fehlenden Werten denselben Typ bekommen
+def create_parquet(df):
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output = spooled_file()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(output, schema) as writer:
+        for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+            chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    output.seek(0)
+    return output
+
+
+_export_cache = OrderedDict()
+_export_cache_lock = threading.Lock()
+
+
+# Fertige Exporte (bytes, wie st.download_button sie erwartet) nach (Format, Inhalts-Hash), die zuletzt
+# benutzten zuerst behalten. Grosse Exporte kommen nicht in den Cache. Exportiert werden die
+# Werte wie in der Datenbank (Texte und Datum als String, siehe expenses.readable_frame).
+def cached_export(kind, df, build):
+    key = (kind, dataframe_hash(df))
+    with _export_cache_lock:
+        if key in _export_cache:
+            _export_cache.move_to_end(key)
+            return _export_cache[key]
+
+    with build(readable_frame(df)) as output:
+        output.seek(0)
+        data = output.read()
+    if len(data) > EXPORT_CACHE_MAX_BYTES:
+        return data
+
+    with _export_cache_lock:
+        _export_cache[key] = data
+        while len(_export_cache) > EXPORT_CACHE_SIZE:
+            _export_cache.popitem(last=False)
+    return data
+
+
+# Exporte, erst beim Herunterladen erzeugt und für gleiche Daten wiederverwendet
+def excel_export(df):
+    return cached_export("xlsx", df, create_excel_with_overview)
+
+
+def csv_export(df):
+    return cached_export("csv", df, create_csv)
+
+
+def parquet_export(df):
+    return cached_export("parquet", df, create_parquet)
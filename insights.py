@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage import AMOUNT_COLUMNS
+
+
+# Gewichtung der Szenarien für den Weighted Average Risk Index (WARI)
+WARI_WEIGHTS = {
+    'estimated': 0.5,
+    'conservative': 0.3,
+    'worst_case': 0.2
+}
+
+# Höchstzahl Segmente eines Kuchendiagramms im Detail-Modus; die kleinsten Einträge werden zu "Other" zusammengefasst
+MAX_PIE_WEDGES = int(os.getenv("OIKOS_MAX_PIE_WEDGES", "200"))
+OTHER_LABEL = "Other"
+
+# Szenarien der Kuchendiagramme: exakte Beträge und exakte Beträge plus die jeweilige Schätzung
+SCENARIO_COLUMNS = ['exact_amount', 'estimated_complete', 'conservative_complete', 'worst_case_complete']
+
+
+# Kennzahlen pro Eintrag, alle Beträge ohne NaN (fehlende Werte zählen als 0)
+def row_metrics(df):
+    amounts = df[AMOUNT_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0)
+    exact_amount = amounts['exact_amount']
+    return pd.DataFrame({
+        'project': df['project'],
+        'priority': pd.to_numeric(df['priority'], errors='coerce'),
+        **{col: amounts[col] for col in AMOUNT_COLUMNS},
+        'estimated_complete': exact_amount + amounts['estimated'],
+        'conservative_complete': exact_amount + amounts['conservative'],
+        'worst_case_complete': exact_amount + amounts['worst_case'],
+        # Durchschnitt der vier Beträge (Blasengrösse im Bubble Chart)
+        'average_cost': amounts.mean(axis=1),
+        'WARI': sum(amounts[col] * weight for col, weight in WARI_WEIGHTS.items()),
+    }, index=df.index)
+
+
+# Alle Kennzahlen pro Projekt in einem einzigen groupby (alphabetisch nach Projekt sortiert)
+def project_summary(rows):
+    sum_columns = AMOUNT_COLUMNS + SCENARIO_COLUMNS[1:] + ['average_cost', 'WARI']
+    summary = rows.groupby('project', observed=True).agg(
+        count=('project', 'size'),
+        priority=('priority', 'mean'),  # Falls Priorität mehrmals vergeben ist, der Durchschnitt
+        **{col: (col, 'sum') for col in sum_columns}
+    )
+    return summary.reset_index()
+
+
+# Einmal pro Rerun: Kennzahlen pro Eintrag und die kompakte Zusammenfassung pro Projekt, aus der alle Diagramme lesen
+def compute_insights(df):
+    rows = row_metrics(df)
+    return rows, project_summary(rows)
+
+
+# Anteile eines Szenarios pro Projekt, absteigend sortiert (für die Legende der Kuchendiagramme)
+def scenario_shares(summary, column):
+    shares = summary[['project', column]].sort_values(by=column, ascending=False)
+    shares['percentage'] = shares[column] / shares[column].sum() * 100
+    return shares.reset_index(drop=True)
+
+
+# Einträge in der Reihenfolge der Kuchendiagramme: Projekte nach ihrer Summe (höchste zuerst),
+# innerhalb eines Projekts nach Betrag absteigend
+def pie_rows(rows, summary, column):
+    ranks = summary.set_index('project')[column].rank(ascending=False, method='dense')
+    project_rank = rows['project'].map(ranks).to_numpy(dtype=float, na_value=np.inf)
+    order = np.lexsort((-rows[column].to_numpy(), project_rank))
+    return rows.iloc[order]
+
+
+# Ein Segment pro Projekt aus den Projektsummen, grösstes Projekt zuerst: (Werte, Projekte)
+def project_pie_wedges(summary, column):
+    shares = scenario_shares(summary, column)
+    return shares[column].to_numpy(), shares['project'].to_numpy(dtype=object)
+
+
+# Ein Segment pro Eintrag (Reihenfolge wie pie_rows), höchstens `max_wedges`: die grössten Einträge
+# bleiben einzeln, alle übrigen bilden am Ende ein gemeinsames Segment OTHER_LABEL
+def detail_pie_wedges(rows, summary, column, max_wedges=MAX_PIE_WEDGES):
+    df_ordered = pie_rows(rows, summary, column)
+    values = df_ordered[column].to_numpy()
+    projects = df_ordered['project'].to_numpy(dtype=object)
+    if len(values) <= max_wedges:
+        return values, projects
+
+    keep = np.zeros(len(values), dtype=bool)
+    keep[np.argpartition(-values, max_wedges - 1)[:max_wedges - 1]] = True
+    return np.append(values[keep], values[~keep].sum()), np.append(projects[keep], OTHER_LABEL)
@@ -0,0 +1,74 @@
+import os
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+# Farbe für Projekte, die nicht in der Registry stehen
+DEFAULT_PROJECT_COLOR = "#FFFFFF"
+
+
+# Ein Projekt mit Anzeigefarbe und optionaler Budgetobergrenze in CHF
+@dataclass(frozen=True)
+class Project:
+    name: str
+    color: str = DEFAULT_PROJECT_COLOR
+    budget: float = None
+
+
+# Projekte in der Anzeigereihenfolge (Filter, Auswahl im Edit-Tab)
+DEFAULT_PROJECTS = [
+    Project("oikos Conference", "#4386e8"),
+    Project("Sustainability Week", "#66ddc1"),
+    Project("Action Days", "#e1d9c4"),
+    Project("Curriculum Change", "#e681e5"),
+    Project("UN-DRESS", "#a3a3a3"),
+    Project("ChangeHub", "#f7be6d"),
+    Project("oikos Solar", "#ffda03"),
+    Project("oikos Catalyst", "#7fcaf9"),
+    Project("Climate Neutral Events", "#3a9953"),
+    Project("oikos Consulting", "#b84040"),
+    Project("Sustainable Finance", "#fa8128"),
+    Project("Oismak", "#bccbdd"),
+]
+
+# Optional eine JSON-Datei, die die Projektliste ersetzt: [{"name": ..., "color": ..., "budget": ...}, ...]
+# (Reihenfolge = Anzeigereihenfolge, "color" und "budget" sind optional)
+PROJECTS_PATH = os.getenv("OIKOS_PROJECTS_PATH", "")
+
+
+def load_projects(path=PROJECTS_PATH):
+    if not path:
+        return list(DEFAULT_PROJECTS)
+    with open(path, encoding="utf-8") as file:
+        entries = json.load(file)
+    return [Project(entry["name"], entry.get("color", DEFAULT_PROJECT_COLOR), entry.get("budget")) for entry in entries]
+
+
+# Alle Angaben zu den Projekten an einer Stelle; ein neues Projekt braucht nur einen Eintrag in der Liste bzw. Datei
+class ProjectRegistry:
+    def __init__(self, projects):
+        self.projects = list(projects)
+        self.by_name = {project.name: project for project in self.projects}
+        self.names = [project.name for project in self.projects]
+
+    def color(self, name, default=DEFAULT_PROJECT_COLOR):
+        project = self.by_name.get(name)
+        return project.color if project is not None else default
+
+    def budget(self, name):
+        project = self.by_name.get(name)
+        return project.budget if project is not None else None
+
+    # Farben für eine ganze Spalte oder Liste von Projekten: nachgeschlagen wird nur einmal pro Kategorie,
+    # danach ist es ein Gather über die Codes. `special` ergänzt Einträge wie das Sammelsegment "Other".
+    def colors(self, projects, special=None, default=DEFAULT_PROJECT_COLOR):
+        categorical = pd.Categorical(projects)
+        special = special or {}
+        palette = [special[name] if name in special else self.color(name, default) for name in categorical.categories]
+        return np.array(palette + [default], dtype=object)[categorical.codes]  # Code -1 (fehlend) = letzter Eintrag
+
+
+project_registry = ProjectRegistry(load_projects())
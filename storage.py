@@ -0,0 +1,757 @@
+import os
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+
+# Felder eines Expense-Eintrags in der gewünschten Reihenfolge
+EXPENSE_COLUMNS = ["id", "project", "title", "description", "expense_date",
+                   "exact_amount", "estimated", "conservative", "worst_case", "priority", "status"]
+AMOUNT_COLUMNS = ["exact_amount", "estimated", "conservative", "worst_case"]
+# Interne Spalten für den Delta-Sync (werden in der App nicht angezeigt)
+SYNC_COLUMNS = ["version"]
+
+# Datumsklassen und Betragsarten des Filter-Panels
+DATE_CLASSES = ("no_date", "unknown", "date")
+AMOUNT_TYPES = ("exact", "estimated")
+
+TABLE_NAME = "oikos_budgeting"
+MAX_INSERT_ATTEMPTS = 5
+TOMBSTONE_RETENTION_DAYS = 30
+
+_last_updated_at = 0
+_updated_at_lock = threading.Lock()
+
+
+# Monoton steigender Zeitstempel in Millisekunden (auch bei mehreren Schreibzugriffen in derselben ms)
+def next_updated_at():
+    global _last_updated_at
+    with _updated_at_lock:
+        _last_updated_at = max(time.time_ns() // 1_000_000, _last_updated_at + 1)
+        return _last_updated_at
+
+
+# Spaltenweise Sicht auf eine Liste von Items (ein Durchlauf pro Spalte)
+def items_to_columns(items, columns):
+    return {col: list(map(dict.get, items, repeat(col))) for col in columns}
+
+
+# Auswahl im Filter-Panel. None heisst "nicht eingeschränkt", eine leere Menge "nichts auswählen".
+@dataclass(frozen=True)
+class ExpenseFilter:
+    projects: frozenset = None
+    statuses: frozenset = None
+    priorities: frozenset = None
+    date_classes: frozenset = None  # Teilmenge von DATE_CLASSES
+    amount_types: frozenset = None  # Teilmenge von AMOUNT_TYPES
+
+    def is_empty(self):
+        return any(values is not None and not values for values in
+                   (self.projects, self.statuses, self.priorities, self.date_classes, self.amount_types))
+
+
+def date_class(expense_date):
+    if expense_date is None:
+        return "no_date"
+    return "unknown" if expense_date == "unknown" else "date"
+
+
+# Filter für ein einzelnes Item, für Backends ohne eigene Filterung
+def item_matches(item, filters):
+    return (
+        (filters.projects is None or item.get("project") in filters.projects)
+        and (filters.statuses is None or item.get("status", "not assigned") in filters.statuses)
+        and (filters.priorities is None or item.get("priority") in filters.priorities)
+        and (filters.date_classes is None or date_class(item.get("expense_date")) in filters.date_classes)
+        and (filters.amount_types is None or ("exact" if item.get("exact_amount") is not None else "estimated") in filters.amount_types)
+    )
+
+
+# Gemeinsame Schnittstelle aller Speicher-Backends. Alle Schreibzugriffe setzen `updated_at`,
+# erhöhen `version` und markieren Löschungen als Tombstone (`deleted`), damit der Delta-Sync
+# in expenses.py mit jedem Backend funktioniert. Items sind einfache dicts mit den Feldern aus EXPENSE_COLUMNS.
+# Ein Backend, dem eine der abstrakten Methoden fehlt, lässt sich gar nicht erst erzeugen.
+class ExpenseStorage(ABC):
+    # False für Backends, deren Daten einen Neustart nicht überleben
+    is_persistent = True
+
+    # Alle nicht gelöschten Einträge
+    @abstractmethod
+    def scan(self):
+        ...
+
+    # Alle nicht gelöschten Einträge als {Spalte: Liste von Werten}
+    def scan_columns(self, columns=EXPENSE_COLUMNS + SYNC_COLUMNS):
+        return items_to_columns(self.scan(), columns)
+
+    # Alle seit `since` (ms) geänderten Einträge inklusive Tombstones
+    @abstractmethod
+    def scan_changes(self, since):
+        ...
+
+    # Nur die Einträge, die zum ExpenseFilter passen; Backends filtern möglichst serverseitig
+    def query(self, filters):
+        if filters.is_empty():
+            return []
+        return [item for item in self.scan() if item_matches(item, filters)]
+
+    # Einzelner Eintrag (auch Tombstones) oder None
+    @abstractmethod
+    def get(self, expense_id):
+        ...
+
+    # Reserviert `count` fortlaufende IDs
+    @abstractmethod
+    def allocate_ids(self, count=1):
+        ...
+
+    # Legt einen neuen Eintrag unter einer frisch vergebenen ID an und gibt das gespeicherte Item zurück
+    def insert(self, item):
+        return self.insert_many([item])[0]
+
+    @abstractmethod
+    def insert_many(self, items):
+        ...
+
+    # Setzt den Status und gibt das neue Item zurück
+    def update_status(self, expense_id, new_status):
+        return self.update_status_many([expense_id], new_status)[0]
+
+    @abstractmethod
+    def update_status_many(self, expense_ids, new_status):
+        ...
+
+    # Markiert einen Eintrag als gelöscht und gibt den Tombstone zurück
+    @abstractmethod
+    def delete(self, expense_id):
+        ...
+
+
+# AWS DynamoDB-Client initialisieren. boto3 wird erst hier geladen; jede Ressource bekommt eine eigene
+# Session, weil die Standard-Session von boto3 nicht thread-safe ist (Scan-Threads erstellen ihre eigene).
+def create_dynamodb_resource():
+    import boto3
+
+    return boto3.session.Session().resource(
+        "dynamodb",
+        region_name=os.getenv("AWS_REGION"),
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
+    )
+
+
+_dynamodb_resource = None
+_dynamodb_resource_lock = threading.Lock()
+
+
+# Prozessweit gemeinsame DynamoDB-Ressource, beim ersten Zugriff erstellt
+def get_dynamodb_resource():
+    global _dynamodb_resource
+    with _dynamodb_resource_lock:
+        if _dynamodb_resource is None:
+            _dynamodb_resource = create_dynamodb_resource()
+        return _dynamodb_resource
+
+
+def is_conditional_check_failure(error):
+    return error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+# Anzahl paralleler Scan-Segmente und maximale Anzahl Items pro Seite (None = DynamoDB-Standard von 1 MB)
+SCAN_SEGMENTS = int(os.getenv("OIKOS_SCAN_SEGMENTS", "4"))
+SCAN_PAGE_SIZE = int(os.getenv("OIKOS_SCAN_PAGE_SIZE", "0")) or None
+# Höchstzahl an Aktionen pro TransactWriteItems bzw. Keys pro BatchGetItem
+TRANSACT_CHUNK_SIZE = 100
+
+
+class DynamoDBStorage(ExpenseStorage):
+    # Zähler-Item für die fortlaufenden IDs; liegt in derselben Tabelle und enthält die zuletzt vergebene ID
+    ID_COUNTER_KEY = "__id_counter__"
+    # Der GSI SYNC_INDEX (Partition `sync_partition`, Sortierschlüssel `updated_at`) liefert alle
+    # Änderungen seit einem Zeitpunkt, ohne die ganze Tabelle zu lesen
+    SYNC_INDEX = "sync_partition-updated_at-index"
+    SYNC_PARTITION = "expense"
+    # GSIs für gefilterte Ansichten (Projektion ALL). Einträge ohne `status` (Standard "not assigned")
+    # fehlen im Status-Index, deshalb wird er für "not assigned" nicht verwendet.
+    PROJECT_INDEX = "project-index"
+    STATUS_INDEX = "status-index"
+
+    def __init__(self, table_name=TABLE_NAME, scan_segments=SCAN_SEGMENTS, page_size=SCAN_PAGE_SIZE):
+        self.table_name = table_name
+        self.scan_segments = scan_segments
+        self.page_size = page_size
+        self.resource = get_dynamodb_resource()
+        self.table = self.resource.Table(table_name)
+        # boto3-Ressourcen sind nicht thread-safe, daher bekommt jeder Scan-Thread seine eigene Tabelle
+        self.thread_local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=max(scan_segments, 1), thread_name_prefix="dynamodb-scan")
+
+    def worker_table(self):
+        if not hasattr(self.thread_local, "table"):
+            self.thread_local.table = create_dynamodb_resource().Table(self.table_name)
+        return self.thread_local.table
+
+    # Liest ein einzelnes Segment vollständig, indem LastEvaluatedKey bis zum Ende gefolgt wird
+    def scan_segment(self, scan_table, segment=0, total_segments=1, **scan_kwargs):
+        # boto3 ergänzt ExpressionAttributeNames um die eigenen Platzhalter, deshalb eine eigene Kopie pro Segment
+        if "ExpressionAttributeNames" in scan_kwargs:
+            scan_kwargs["ExpressionAttributeNames"] = dict(scan_kwargs["ExpressionAttributeNames"])
+        if total_segments > 1:
+            scan_kwargs["Segment"] = segment
+            scan_kwargs["TotalSegments"] = total_segments
+        if self.page_size:
+            scan_kwargs["Limit"] = self.page_size
+
+        items = []
+        while True:
+            response = scan_table.scan(**scan_kwargs)
+            items.extend(response.get("Items", []))
+
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return items
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+    def scan_worker_segment(self, segment, total_segments, **scan_kwargs):
+        return self.scan_segment(self.worker_table(), segment, total_segments, **scan_kwargs)
+
+    # Liest die ganze Tabelle, aufgeteilt in parallele Segmente (Segment/TotalSegments)
+    def scan_table(self, **scan_kwargs):
+        if self.scan_segments <= 1:
+            return self.scan_segment(self.table, **scan_kwargs)
+
+        futures = [
+            self.executor.submit(self.scan_worker_segment, segment, self.scan_segments, **scan_kwargs)
+            for segment in range(self.scan_segments)
+        ]
+
+        # Reihenfolge der Segmente beibehalten, damit das Ergebnis deterministisch ist
+        items = []
+        for future in futures:
+            items.extend(future.result())
+        return items
+
+    def live_filter(self):
+        from boto3.dynamodb.conditions import Attr
+
+        return Attr("deleted").not_exists() & Attr("id").ne(self.ID_COUNTER_KEY)
+
+    # ProjectionExpression für die angeforderten Spalten. Die Namen laufen über Platzhalter, weil
+    # z.B. `status` ein reserviertes Wort ist; die FilterExpression wertet trotzdem das ganze Item aus.
+    def projection_kwargs(self, columns):
+        names = {f"#p{index}": col for index, col in enumerate(columns)}
+        return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+    # Ohne gelöschte Einträge und ohne das Zähler-Item
+    def scan(self):
+        return self.scan_table(FilterExpression=self.live_filter())
+
+    # Nur die angeforderten Attribute lesen (ohne interne Attribute wie sync_partition und updated_at)
+    def scan_columns(self, columns=EXPENSE_COLUMNS + SYNC_COLUMNS):
+        return items_to_columns(self.scan_table(FilterExpression=self.live_filter(), **self.projection_kwargs(columns)), columns)
+
+    # Änderungen über den Sync-Index. Ohne Index wird auf einen gefilterten Scan ausgewichen:
+    # das Ergebnis ist gleich, kostet aber Lesekapazität für die ganze Tabelle.
+    def scan_changes(self, since):
+        from boto3.dynamodb.conditions import Attr, Key
+
+        query_kwargs = {
+            "IndexName": self.SYNC_INDEX,
+            "KeyConditionExpression": Key("sync_partition").eq(self.SYNC_PARTITION) & Key("updated_at").gt(since),
+        }
+        try:
+            items = self.query_pages(self.table, **query_kwargs)
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") != "ValidationException":
+                raise
+            items = self.scan_table(FilterExpression=Attr("updated_at").gt(since))
+        return [item for item in items if item["id"] != self.ID_COUNTER_KEY]
+
+    # Übersetzt den Filter in eine FilterExpression (ohne die Bedingung, die schon im KeyConditionExpression steckt)
+    def filter_expression(self, filters, key_attribute=None):
+        from boto3.dynamodb.conditions import Attr
+
+        expression = self.live_filter()
+        if filters.projects is not None and key_attribute != "project":
+            expression &= Attr("project").is_in(sorted(filters.projects))
+        if filters.statuses is not None and key_attribute != "status":
+            expression &= Attr("status").is_in(sorted(filters.statuses))
+        if filters.priorities is not None:
+            expression &= Attr("priority").is_in(sorted(filters.priorities))
+        if filters.date_classes is not None and set(filters.date_classes) != set(DATE_CLASSES):
+            no_date = Attr("expense_date").not_exists() | Attr("expense_date").attribute_type("NULL")
+            conditions = {
+                "no_date": no_date,
+                "unknown": Attr("expense_date").eq("unknown"),
+                "date": Attr("expense_date").attribute_type("S") & Attr("expense_date").ne("unknown"),
+            }
+            date_expression = None
+            for date_class_name in sorted(filters.date_classes):
+                condition = conditions[date_class_name]
+                date_expression = condition if date_expression is None else date_expression | condition
+            expression &= date_expression
+        if filters.amount_types is not None and set(filters.amount_types) != set(AMOUNT_TYPES):
+            has_exact = Attr("exact_amount").attribute_type("N") | Attr("exact_amount").attribute_type("S")
+            expression &= has_exact if "exact" in filters.amount_types else ~has_exact
+        return expression
+
+    # Liest alle Seiten einer Query
+    def query_pages(self, query_table, **query_kwargs):
+        items = []
+        while True:
+            response = query_table.query(**query_kwargs)
+            items.extend(response.get("Items", []))
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return items
+            query_kwargs["ExclusiveStartKey"] = last_key
+
+    def query_worker_index(self, index_name, key_attribute, value, filter_expression):
+        from boto3.dynamodb.conditions import Key
+
+        return self.query_pages(
+            self.worker_table(),
+            IndexName=index_name,
+            KeyConditionExpression=Key(key_attribute).eq(value),
+            FilterExpression=filter_expression
+        )
+
+    # Eine Query pro ausgewähltem Projekt (bzw. Status) über den passenden GSI, parallel im Scan-Pool.
+    # Ohne Projekt- oder Statusauswahl bleibt nur ein Scan mit FilterExpression.
+    def query(self, filters):
+        if filters.is_empty():
+            return []
+        if filters.projects is not None:
+            index_name, key_attribute, values = self.PROJECT_INDEX, "project", filters.projects
+        elif filters.statuses is not None and "not assigned" not in filters.statuses:
+            index_name, key_attribute, values = self.STATUS_INDEX, "status", filters.statuses
+        else:
+            return self.scan_table(FilterExpression=self.filter_expression(filters))
+
+        filter_expression = self.filter_expression(filters, key_attribute)
+        futures = [
+            self.executor.submit(self.query_worker_index, index_name, key_attribute, value, filter_expression)
+            for value in sorted(values)
+        ]
+        items = []
+        for future in futures:
+            items.extend(future.result())
+        return items
+
+    def get(self, expense_id):
+        if str(expense_id) == self.ID_COUNTER_KEY:
+            return None
+        return self.table.get_item(Key={"id": str(expense_id)}).get("Item")
+
+    # Legt den Zähler einmalig an und startet bei der höchsten bereits vergebenen ID
+    def seed_id_counter(self):
+        existing_ids = [int(item["id"]) for item in self.scan_table(ProjectionExpression="id") if str(item["id"]).isdigit()]
+        try:
+            self.table.put_item(
+                Item={"id": self.ID_COUNTER_KEY, "last_id": max(existing_ids, default=0)},
+                ConditionExpression="attribute_not_exists(id)"  # Ein anderer Prozess war schneller
+            )
+        except ClientError as error:
+            if not is_conditional_check_failure(error):
+                raise
+
+    # Reserviert atomar einen Block von `count` fortlaufenden IDs (UpdateItem ADD, O(1) statt Tabellen-Scan)
+    def allocate_ids(self, count=1):
+        for _ in range(2):
+            try:
+                response = self.table.update_item(
+                    Key={"id": self.ID_COUNTER_KEY},
+                    UpdateExpression="ADD last_id :count",
+                    ConditionExpression="attribute_exists(id)",
+                    ExpressionAttributeValues={":count": count},
+                    ReturnValues="UPDATED_NEW"
+                )
+                last_id = int(response["Attributes"]["last_id"])
+                return [str(expense_id) for expense_id in range(last_id - count + 1, last_id + 1)]
+            except ClientError as error:
+                if not is_conditional_check_failure(error):
+                    raise
+                # Zähler existiert noch nicht
+                self.seed_id_counter()
+        raise RuntimeError("ID counter could not be initialised")
+
+    # Der bedingte Put überschreibt nie einen bestehenden Eintrag; ist die ID (z.B. von ausserhalb
+    # der App) schon belegt, wird die nächste genommen
+    def put_new(self, item, expense_id=None):
+        for _ in range(MAX_INSERT_ATTEMPTS):
+            item = {
+                **item,
+                "id": expense_id or self.allocate_ids(1)[0],
+                "updated_at": next_updated_at(),
+                "sync_partition": self.SYNC_PARTITION,
+                "version": 1,
+            }
+            try:
+                self.table.put_item(Item=item, ConditionExpression="attribute_not_exists(id)")
+                return item
+            except ClientError as error:
+                if not is_conditional_check_failure(error):
+                    raise
+                expense_id = None
+        raise RuntimeError(f"No free expense ID found after {MAX_INSERT_ATTEMPTS} attempts")
+
+    # Reserviert die IDs für alle Einträge mit einem einzigen Zähler-Update
+    def insert_many(self, items):
+        expense_ids = self.allocate_ids(len(items)) if items else []
+        return [self.put_new(item, expense_id) for item, expense_id in zip(items, expense_ids)]
+
+    def update_status(self, expense_id, new_status):
+        response = self.table.update_item(
+            Key={"id": str(expense_id)},  # ID muss String sein
+            UpdateExpression="SET #s = :s, updated_at = :t, sync_partition = :p ADD version :one",
+            ConditionExpression="attribute_exists(id) AND attribute_not_exists(deleted)",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":s": new_status, ":t": next_updated_at(), ":p": self.SYNC_PARTITION, ":one": 1},
+            ReturnValues="ALL_NEW"
+        )
+        return response["Attributes"]
+
+    # Status-Updates in Transaktionen zu je TRANSACT_CHUNK_SIZE Einträgen. Jede Transaktion gilt ganz oder
+    # gar nicht; fehlt ein Eintrag, bricht der Aufruf ab (vorherige Blöcke bleiben gespeichert).
+    def update_status_many(self, expense_ids, new_status):
+        expense_ids = list(dict.fromkeys(str(expense_id) for expense_id in expense_ids))  # keine doppelten Keys pro Transaktion
+        for start in range(0, len(expense_ids), TRANSACT_CHUNK_SIZE):
+            chunk = expense_ids[start:start + TRANSACT_CHUNK_SIZE]
+            try:
+                self.resource.meta.client.transact_write_items(TransactItems=[
+                    {"Update": {
+                        "TableName": self.table_name,
+                        "Key": {"id": expense_id},
+                        "UpdateExpression": "SET #s = :s, updated_at = :t, sync_partition = :p ADD version :one",
+                        "ConditionExpression": "attribute_exists(id) AND attribute_not_exists(deleted)",
+                        "ExpressionAttributeNames": {"#s": "status"},
+                        "ExpressionAttributeValues": {":s": new_status, ":t": next_updated_at(), ":p": self.SYNC_PARTITION, ":one": 1},
+                    }}
+                    for expense_id in chunk
+                ])
+            except ClientError as error:
+                if error.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                    raise
+                reasons = error.response.get("CancellationReasons", [])
+                missing = [expense_id for expense_id, reason in zip(chunk, reasons) if reason.get("Code") == "ConditionalCheckFailed"]
+                if not missing:
+                    raise
+                raise LookupError(f"No entry found with ID {', '.join(missing)}") from error
+        items = {item["id"]: item for item in self.batch_get(expense_ids)}
+        return [items[expense_id] for expense_id in expense_ids if expense_id in items]
+
+    # Liest mehrere Einträge mit BatchGetItem (konsistent, damit die eben geschriebenen Versionen zurückkommen)
+    def batch_get(self, expense_ids):
+        items = []
+        for start in range(0, len(expense_ids), TRANSACT_CHUNK_SIZE):
+            request = {self.table_name: {"Keys": [{"id": expense_id} for expense_id in expense_ids[start:start + TRANSACT_CHUNK_SIZE]],
+                                         "ConsistentRead": True}}
+            while request:
+                response = self.resource.batch_get_item(RequestItems=request)
+                items.extend(response.get("Responses", {}).get(self.table_name, []))
+                request = response.get("UnprocessedKeys")
+                if request:
+                    time.sleep(0.05)  # gedrosselt: kurz warten, dann die restlichen Keys nachfordern
+        return items
+
+    # Tombstones werden über das DynamoDB-TTL-Attribut `expires_at` nach einiger Zeit entfernt
+    def delete(self, expense_id):
+        expires_at = int(time.time()) + TOMBSTONE_RETENTION_DAYS * 24 * 3600
+        response = self.table.update_item(
+            Key={"id": str(expense_id)},
+            UpdateExpression="SET deleted = :true, updated_at = :t, sync_partition = :p, expires_at = :e ADD version :one",
+            ConditionExpression="attribute_exists(id) AND attribute_not_exists(deleted)",
+            ExpressionAttributeValues={":true": True, ":t": next_updated_at(), ":p": self.SYNC_PARTITION, ":e": expires_at, ":one": 1},
+            ReturnValues="ALL_NEW"
+        )
+        return response["Attributes"]
+
+
+# Gemeinsame Umsetzung für relationale Datenbanken. Die Abfragen sind in %s-Schreibweise
+# geschrieben; SQLite ersetzt die Platzhalter durch `?`.
+class SQLStorage(ExpenseStorage):
+    ROW_COLUMNS = EXPENSE_COLUMNS + ["updated_at", "version", "deleted"]
+    SELECT_COLUMNS = ", ".join(ROW_COLUMNS)
+    # Bedingung für rein numerische IDs (für den Start des ID-Zählers)
+    NUMERIC_ID_CONDITION = "TRUE"
+
+    def __init__(self, table_name=TABLE_NAME):
+        self.table_name = table_name
+
+    # Verbindung als Context-Manager (Commit am Ende, Rollback bei Fehlern), von jedem Datenbank-Backend umgesetzt
+    @abstractmethod
+    def connection(self):
+        ...
+
+    def sql(self, statement):
+        return statement.format(table=self.table_name)
+
+    def execute(self, cursor, statement, params=()):
+        cursor.execute(self.sql(statement), params)
+        return cursor
+
+    def create_schema(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self.execute(cursor, """
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id TEXT PRIMARY KEY,
+                    project TEXT,
+                    title TEXT,
+                    description TEXT,
+                    expense_date TEXT,
+                    exact_amount NUMERIC,
+                    estimated NUMERIC,
+                    conservative NUMERIC,
+                    worst_case NUMERIC,
+                    priority INTEGER,
+                    status TEXT NOT NULL DEFAULT 'not assigned',
+                    updated_at BIGINT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    deleted BOOLEAN NOT NULL DEFAULT FALSE
+                )
+            """)
+            self.execute(cursor, "CREATE INDEX IF NOT EXISTS {table}_updated_at_idx ON {table} (updated_at)")
+            self.execute(cursor, "CREATE INDEX IF NOT EXISTS {table}_project_idx ON {table} (project)")
+            self.execute(cursor, "CREATE INDEX IF NOT EXISTS {table}_status_idx ON {table} (status)")
+            # ID-Zähler, startet bei der höchsten bereits vergebenen ID
+            self.execute(cursor, "CREATE TABLE IF NOT EXISTS {table}_id_counter (name TEXT PRIMARY KEY, last_id BIGINT NOT NULL)")
+            self.execute(cursor, f"""
+                INSERT INTO {{table}}_id_counter (name, last_id)
+                SELECT 'expense', COALESCE(MAX(CAST(id AS BIGINT)), 0) FROM {{table}} WHERE {self.NUMERIC_ID_CONDITION}
+                ON CONFLICT (name) DO NOTHING
+            """)
+
+    def row_to_item(self, row):
+        item = dict(zip(self.ROW_COLUMNS, row))
+        item["deleted"] = bool(item["deleted"])
+        return item
+
+    def placeholders(self, values):
+        return ", ".join(["%s"] * len(values))
+
+    def scan(self):
+        with self.connection() as conn:
+            cursor = self.execute(conn.cursor(), f"SELECT {self.SELECT_COLUMNS} FROM {{table}} WHERE NOT deleted")
+            return [self.row_to_item(row) for row in cursor.fetchall()]
+
+    # Direkt spaltenweise aus dem Cursor, ohne Umweg über ein dict pro Zeile
+    def scan_columns(self, columns=EXPENSE_COLUMNS + SYNC_COLUMNS):
+        with self.connection() as conn:
+            cursor = self.execute(conn.cursor(), f"SELECT {', '.join(columns)} FROM {{table}} WHERE NOT deleted")
+            rows = cursor.fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        return {col: list(column_values) for col, column_values in zip(columns, values)}
+
+    def scan_changes(self, since):
+        with self.connection() as conn:
+            cursor = self.execute(conn.cursor(), f"SELECT {self.SELECT_COLUMNS} FROM {{table}} WHERE updated_at > %s", (since,))
+            return [self.row_to_item(row) for row in cursor.fetchall()]
+
+    # WHERE-Klausel und Parameter für einen ExpenseFilter
+    def where_clause(self, filters):
+        conditions, params = ["NOT deleted"], []
+        for column, values in (("project", filters.projects), ("status", filters.statuses), ("priority", filters.priorities)):
+            if values is not None:
+                values = sorted(values)
+                conditions.append(f"{column} IN ({self.placeholders(values)})")
+                params.extend(values)
+        if filters.date_classes is not None and set(filters.date_classes) != set(DATE_CLASSES):
+            date_conditions = {
+                "no_date": "expense_date IS NULL",
+                "unknown": "expense_date = 'unknown'",
+                "date": "(expense_date IS NOT NULL AND expense_date <> 'unknown')",
+            }
+            conditions.append("(" + " OR ".join(date_conditions[name] for name in sorted(filters.date_classes)) + ")")
+        if filters.amount_types is not None and set(filters.amount_types) != set(AMOUNT_TYPES):
+            conditions.append("exact_amount IS NOT NULL" if "exact" in filters.amount_types else "exact_amount IS NULL")
+        return " AND ".join(conditions), params
+
+    # Filter werden in der WHERE-Klausel ausgewertet
+    def query(self, filters):
+        if filters.is_empty():
+            return []
+        condition, params = self.where_clause(filters)
+        with self.connection() as conn:
+            cursor = self.execute(conn.cursor(), f"SELECT {self.SELECT_COLUMNS} FROM {{table}} WHERE {condition}", params)
+            return [self.row_to_item(row) for row in cursor.fetchall()]
+
+    def get(self, expense_id):
+        with self.connection() as conn:
+            cursor = self.execute(conn.cursor(), f"SELECT {self.SELECT_COLUMNS} FROM {{table}} WHERE id = %s", (str(expense_id),))
+            row = cursor.fetchone()
+        return self.row_to_item(row) if row else None
+
+    def allocate_ids_with(self, cursor, count):
+        cursor = self.execute(cursor, "UPDATE {table}_id_counter SET last_id = last_id + %s WHERE name = 'expense' RETURNING last_id", (count,))
+        last_id = int(cursor.fetchone()[0])
+        return [str(expense_id) for expense_id in range(last_id - count + 1, last_id + 1)]
+
+    def allocate_ids(self, count=1):
+        with self.connection() as conn:
+            return self.allocate_ids_with(conn.cursor(), count)
+
+    # Fügt Zeilen ein und gibt die IDs zurück, die tatsächlich eingefügt wurden (bestehende IDs werden übersprungen)
+    def insert_rows(self, cursor, rows):
+        inserted = []
+        for row in rows:
+            cursor = self.execute(
+                cursor,
+                f"INSERT INTO {{table}} ({self.SELECT_COLUMNS}) VALUES ({self.placeholders(row)}) ON CONFLICT (id) DO NOTHING RETURNING id",
+                row
+            )
+            result = cursor.fetchone()
+            if result:
+                inserted.append(result[0])
+        return inserted
+
+    # Mengenbasiert: ein Zähler-Update für alle IDs und ein gemeinsamer INSERT
+    def insert_many(self, items):
+        saved = [{"status": "not assigned", **item} for item in items]
+        if not saved:
+            return []
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            pending = saved
+            for _ in range(MAX_INSERT_ATTEMPTS):
+                expense_ids = self.allocate_ids_with(cursor, len(pending))
+                for item, expense_id in zip(pending, expense_ids):
+                    item.update({"id": expense_id, "updated_at": next_updated_at(), "version": 1, "deleted": False})
+                rows = [tuple(item.get(col) for col in self.ROW_COLUMNS) for item in pending]
+                inserted = set(self.insert_rows(cursor, rows))
+                # Bereits belegte IDs (z.B. von ausserhalb der App) bekommen im nächsten Durchlauf neue IDs
+                pending = [item for item in pending if item["id"] not in inserted]
+                if not pending:
+                    return saved
+        raise RuntimeError(f"No free expense ID found after {MAX_INSERT_ATTEMPTS} attempts")
+
+    # Ein einziges UPDATE für alle IDs
+    def update_status_many(self, expense_ids, new_status):
+        expense_ids = [str(expense_id) for expense_id in expense_ids]
+        if not expense_ids:
+            return []
+        with self.connection() as conn:
+            cursor = self.execute(
+                conn.cursor(),
+                f"""UPDATE {{table}} SET status = %s, updated_at = %s, version = version + 1
+                    WHERE id IN ({self.placeholders(expense_ids)}) AND NOT deleted
+                    RETURNING {self.SELECT_COLUMNS}""",
+                [new_status, next_updated_at(), *expense_ids]
+            )
+            items = {item["id"]: item for item in map(self.row_to_item, cursor.fetchall())}
+        missing = [expense_id for expense_id in expense_ids if expense_id not in items]
+        if missing:
+            raise LookupError(f"No entry found with ID {', '.join(missing)}")
+        return [items[expense_id] for expense_id in expense_ids]
+
+    def delete(self, expense_id):
+        with self.connection() as conn:
+            cursor = self.execute(
+                conn.cursor(),
+                f"""UPDATE {{table}} SET deleted = TRUE, updated_at = %s, version = version + 1
+                    WHERE id = %s AND NOT deleted
+                    RETURNING {self.SELECT_COLUMNS}""",
+                (next_updated_at(), str(expense_id))
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise LookupError(f"No entry found with ID {expense_id}")
+        return self.row_to_item(row)
+
+
+# PostgreSQL mit Connection-Pool; Zugangsdaten als URL in OIKOS_DATABASE_URL
+class PostgresStorage(SQLStorage):
+    NUMERIC_ID_CONDITION = "id ~ '^[0-9]+$'"
+
+    def __init__(self, dsn=None, table_name=TABLE_NAME, min_connections=1, max_connections=10):
+        import psycopg2.pool
+        super().__init__(table_name)
+        self.pool = psycopg2.pool.ThreadedConnectionPool(min_connections, max_connections, dsn or os.getenv("OIKOS_DATABASE_URL"))
+        self.create_schema()
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    # Ein einziger INSERT mit allen Zeilen (execute_values)
+    def insert_rows(self, cursor, rows):
+        from psycopg2.extras import execute_values
+        result = execute_values(
+            cursor,
+            self.sql(f"INSERT INTO {{table}} ({self.SELECT_COLUMNS}) VALUES %s ON CONFLICT (id) DO NOTHING RETURNING id"),
+            rows,
+            fetch=True
+        )
+        return [row[0] for row in result]
+
+
+# SQLite, standardmässig im Arbeitsspeicher: die App und die Benchmarks laufen damit ohne Netzwerk
+class SQLiteStorage(SQLStorage):
+    NUMERIC_ID_CONDITION = "id NOT GLOB '*[^0-9]*' AND id <> ''"
+
+    def __init__(self, path=":memory:", table_name=TABLE_NAME):
+        super().__init__(table_name)
+        self.is_persistent = path != ":memory:"
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.create_schema()
+
+    @contextmanager
+    def connection(self):
+        with self.lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def execute(self, cursor, statement, params=()):
+        cursor.execute(self.sql(statement).replace("%s", "?"), tuple(params))
+        return cursor
+
+
+# Backend über OIKOS_STORAGE wählen: "dynamodb" (Standard), "postgres" oder "sqlite"
+def create_storage(kind=None):
+    kind = (kind or os.getenv("OIKOS_STORAGE", "dynamodb")).lower()
+    if kind == "dynamodb":
+        return DynamoDBStorage()
+    if kind in ("postgres", "postgresql"):
+        return PostgresStorage()
+    if kind == "sqlite":
+        return SQLiteStorage(os.getenv("OIKOS_SQLITE_PATH", ":memory:"))
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+# Prozessweit gemeinsames Backend, wird beim ersten Zugriff erstellt
+def get_storage():
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = create_storage()
+        return _storage
+
+
+def set_storage(storage):
+    global _storage
+    with _storage_lock:
+        _storage = storage
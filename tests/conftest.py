@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AWS_REGION", "eu-central-1")
+os.environ.setdefault("OIKOS_BOARD_PASSWORD", "test")
+os.environ["OIKOS_STORAGE"] = "sqlite"
+os.environ["OIKOS_SNAPSHOT_PATH"] = ""
+
+import expenses
+from storage import SQLiteStorage, set_storage
+
+
+# Jeder Test bekommt eine leere SQLite-Datenbank im Arbeitsspeicher und frische Snapshots
+@pytest.fixture(autouse=True)
+def sqlite_storage(monkeypatch):
+    storage = SQLiteStorage(":memory:")
+    set_storage(storage)
+    monkeypatch.setattr(expenses, "expense_snapshot", expenses.ExpenseSnapshot(snapshot_path=""))
+    yield storage
+    set_storage(None)
+
+
+def make_item(project="oikos Conference", **fields):
+    return {"project": project, "title": "Catering", "description": "Lunch", "expense_date": "2024-05-01",
+            "exact_amount": 120.5, "priority": 2, "status": "not assigned", **fields}
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import expenses
+from conftest import make_item
+
+BOARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "board.py")
+
+
+@pytest.fixture
+def app():
+    for i in range(6):
+        expenses.create_expense(make_item(["oikos Conference", "Oismak"][i % 2], status=["not assigned", "approved"][i % 2 and i > 2]))
+    at = AppTest.from_file(BOARD, default_timeout=60)
+    at.session_state["logged_in"] = True
+    at.session_state["user"] = "board"
+    return at.run()
+
+
+def click(at, label):
+    next(button for button in at.button if button.label == label).click().run()
+
+
+def test_entering_an_expense_refreshes_the_whole_app(app):
+    app.segmented_control(key="active_view").set_value("Edit").run()
+    app.text_input[0].input("New expense")
+    click(app, "Submit")
+
+    assert not app.exception
+    assert [success.value for success in app.success] == ["Expense successfully saved!"]
+    assert len(app.dataframe[0].value) == 7
+
+
+def test_deleting_an_expense_refreshes_the_whole_app(app):
+    app.segmented_control(key="active_view").set_value("Edit").run()
+    next(field for field in app.number_input if field.label.startswith("Enter the ID")).set_value(1)
+    click(app, "Check")
+    click(app, "Delete")
+
+    assert not app.exception
+    assert [success.value for success in app.success] == ["Expense successfully deleted!"]
+    assert "1" not in app.dataframe[0].value.index
+
+
+def test_bulk_action_clears_the_selection(app):
+    app.toggle(key="show_cards_approved").set_value(True).run()
+    app.checkbox(key="select_1").check().run()
+    app.button(key="bulk_not assigned_approved").click().run()
+
+    assert not app.exception
+    assert not app.checkbox(key="select_1").value
+    assert app.button(key="bulk_approved_not assigned").disabled
+    assert "0 selected" in [markdown.value for markdown in app.markdown]
+
+
+def test_insights_reuse_the_loaded_expenses(app, monkeypatch):
+    calls = []
+    get_filtered_expenses = expenses.get_filtered_expenses
+    monkeypatch.setattr(expenses, "get_filtered_expenses", lambda *args: calls.append(args) or get_filtered_expenses(*args))
+    app.segmented_control(key="active_view").set_value("Insights").run()
+
+    assert not app.exception
+    assert len(calls) == 1
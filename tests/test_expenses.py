@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from conftest import make_item
+
+import expenses
+from storage import AMOUNT_TYPES, DATE_CLASSES, ExpenseFilter, item_matches
+
+
+def test_new_project_is_visible_without_reload():
+    expenses.create_expense(make_item("oikos Conference"))
+    assert len(expenses.get_expenses()) == 1
+
+    expenses.create_expense(make_item("Oismak"))
+
+    assert "Oismak" in expenses.known_projects()
+    df = expenses.get_filtered_expenses(ExpenseFilter())
+    assert sorted(df["project"].astype(str)) == ["Oismak", "oikos Conference"]
+
+
+def test_conversion_keeps_stored_dates_and_priorities():
+    stored = [("15.05.2024", 7), ("2024-05", 2), ("unknown", None), (None, 300), ("2024-01-02", 1)]
+    df = expenses.items_to_dataframe([make_item(id=str(i + 1), expense_date=date, priority=priority)
+                                      for i, (date, priority) in enumerate(stored)])
+
+    readable = expenses.readable_frame(df)
+    assert list(zip(readable["expense_date"], readable["priority"].astype(object).where(readable["priority"].notna(), None))) == stored
+    assert df["date_unknown"].tolist() == [False, False, True, False, False]
+    assert df["no_date"].tolist() == [False, False, False, True, False]
+    # Lesbare Daten zuerst, danach "unknown" und nicht lesbare, zuletzt ohne Datum
+    assert expenses.sort_frame(df, "expense_date")["id"].tolist()[:2] == ["5", "2"]
+    assert expenses.sort_frame(df, "expense_date")["id"].tolist()[-1] == "4"
+
+
+PROJECTS = ["oikos Conference", "Oismak", "action days", "New Project", "Zeta"]
+DATES = ["2024-05-01", "2023-12-24", "2024-05", "15.05.2024", "unknown", None]
+
+
+def random_item(rng):
+    return make_item(rng.choice(PROJECTS), expense_date=rng.choice(DATES), priority=rng.choice([1, 2, 3, 5, None]),
+                     exact_amount=rng.choice([120.5, None]), status=rng.choice(expenses.STATUSES))
+
+
+# Zufällige Schreibzugriffe, wie sie die App ausführt: neue Einträge, einzelne und gesammelte Statusänderungen, Löschungen
+def random_write(rng, ids):
+    action = rng.choice(["insert", "insert", "update", "bulk", "delete"] if ids else ["insert"])
+    if action == "insert":
+        ids.append(expenses.create_expense(random_item(rng))["id"])
+    elif action == "update":
+        expenses.update_expense_status(rng.choice(ids), rng.choice(expenses.STATUSES))
+    elif action == "bulk":
+        expenses.update_expense_statuses(rng.sample(ids, min(len(ids), rng.randint(1, 4))), rng.choice(expenses.STATUSES))
+    else:
+        expense_id = rng.choice(ids)
+        expenses.delete_expense(expense_id)
+        ids.remove(expense_id)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sort_index_matches_a_fresh_sort_after_random_writes(seed, sqlite_storage):
+    rng = random.Random(seed)
+    ids = [expenses.create_expense(random_item(rng))["id"] for _ in range(10)]
+    for sort_by in expenses.SORT_KEYS:
+        expenses.get_expenses(sort_by=sort_by)  # Permutationen aufbauen, danach werden sie nur noch nachgeführt
+
+    for _ in range(60):
+        random_write(rng, ids)
+        df = expenses.get_expenses()
+        assert sorted(df["id"], key=int) == sorted((item["id"] for item in sqlite_storage.scan()), key=int)
+        for sort_by in expenses.SORT_KEYS:
+            assert expenses.get_expenses(sort_by=sort_by)["id"].tolist() == expenses.sort_frame(df, sort_by)["id"].tolist()
+
+
+def random_subset(rng, values):
+    return frozenset(rng.sample(list(values), rng.randint(0, len(values)))) if rng.random() < 0.6 else None
+
+
+def random_filter(rng):
+    return ExpenseFilter(projects=random_subset(rng, PROJECTS + ["Unused"]), statuses=random_subset(rng, expenses.STATUSES),
+                         priorities=random_subset(rng, [1, 2, 3, 4, 5]), date_classes=random_subset(rng, DATE_CLASSES),
+                         amount_types=random_subset(rng, AMOUNT_TYPES))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_filter_bitmaps_match_item_matches_after_random_writes(seed, sqlite_storage):
+    rng = random.Random(seed)
+    ids = [expenses.create_expense(random_item(rng))["id"] for _ in range(10)]
+
+    for _ in range(60):
+        random_write(rng, ids)
+        for _ in range(5):
+            filters = random_filter(rng)
+            expected = sorted((item["id"] for item in sqlite_storage.scan() if item_matches(item, filters)), key=int)
+            assert sorted(expenses.get_expenses(filters)["id"], key=int) == expected
+            sort_by = rng.choice(expenses.SORT_KEYS)
+            df = expenses.get_expenses(sort_by=sort_by)
+            assert expenses.get_expenses(filters, sort_by)["id"].tolist() == [expense_id for expense_id in df["id"] if expense_id in expected]
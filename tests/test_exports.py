@@ -0,0 +1,38 @@
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+import exports
+from expenses import items_to_dataframe
+from conftest import make_item
+
+
+def make_frame(n, description="Lunch"):
+    return items_to_dataframe([make_item(["oikos Conference", "Oismak"][i % 2], id=str(i + 1), version=1,
+                                         description=description, expense_date=[None, "unknown", "2024-05-01"][i % 3])
+                               for i in range(n)])
+
+
+def test_csv_export_keeps_stored_values():
+    data = exports.csv_export(make_frame(3))
+    df = pd.read_csv(BytesIO(data), dtype=str, keep_default_na=False)
+    assert df["expense_date"].tolist() == ["", "unknown", "2024-05-01"]
+    assert df["project"].tolist() == ["oikos Conference", "Oismak", "oikos Conference"]
+
+
+def test_excel_export_has_overview_and_project_sheets():
+    data = exports.excel_export(make_frame(4))
+    with zipfile.ZipFile(BytesIO(data)) as workbook:
+        sheets = workbook.read("xl/workbook.xml").decode()
+    assert all(f'name="{name}"' in sheets for name in ("Overview", "oikos Conference", "Oismak"))
+
+
+# Exporte über EXPORT_CACHE_MAX_BYTES werden nicht zwischengespeichert, müssen aber trotzdem bytes sein
+def test_large_export_returns_bytes():
+    df = make_frame(60_000, description="x" * 300)
+    data = exports.csv_export(df)
+    assert isinstance(data, bytes)
+    assert len(data) > exports.EXPORT_CACHE_MAX_BYTES
+    assert data.count(b"\n") == len(df) + 1
+    assert ("csv", exports.dataframe_hash(df)) not in exports._export_cache
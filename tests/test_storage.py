@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+import pytest
+
+import storage
+from storage import DynamoDBStorage, ExpenseFilter, SQLiteStorage, SQLStorage
+from conftest import make_item
+
+
+def round_trip(backend, item):
+    first, second = backend.insert_many([item, {**item, "project": "Oismak"}])
+    assert (first["id"], second["id"]) == ("1", "2")
+
+    rows = backend.query(ExpenseFilter(projects=frozenset({"Oismak"})))
+    assert [(row["id"], row["project"]) for row in rows] == [("2", "Oismak")]
+
+    updated = backend.update_status_many(["1", "2"], "approved")
+    assert sorted((row["id"], row["status"], int(row["version"])) for row in updated) == [("1", "approved", 2), ("2", "approved", 2)]
+    rows = backend.query(ExpenseFilter(statuses=frozenset({"approved"})))
+    assert sorted(row["id"] for row in rows) == ["1", "2"]
+
+    backend.delete("1")
+    assert [row["id"] for row in backend.scan()] == ["2"]
+    assert any(row["id"] == "1" and row["deleted"] for row in backend.scan_changes(0))
+
+
+def test_sqlite_round_trip():
+    round_trip(SQLiteStorage(":memory:"), make_item())
+
+
+def test_backend_without_connection_cannot_be_created():
+    class IncompleteStorage(SQLStorage):
+        pass
+
+    with pytest.raises(TypeError, match="connection"):
+        IncompleteStorage()
+
+
+def test_sqlite_rejects_missing_ids():
+    backend = SQLiteStorage(":memory:")
+    backend.insert(make_item())
+    with pytest.raises(LookupError):
+        backend.update_status_many(["1", "7"], "approved")
+    with pytest.raises(LookupError):
+        backend.delete("7")
+
+
+def key_schema(*keys):
+    return [{"AttributeName": name, "KeyType": key_type} for name, key_type in zip(keys, ("HASH", "RANGE"))]
+
+
+def index(name, *keys):
+    return {"IndexName": name, "KeySchema": key_schema(*keys), "Projection": {"ProjectionType": "ALL"}}
+
+
+# Tabelle mit denselben GSIs wie in AWS, im Speicher von moto (siehe requirements-test.txt)
+@pytest.fixture
+def dynamodb_table(monkeypatch):
+    moto = pytest.importorskip("moto")
+    with moto.mock_aws():
+        monkeypatch.setattr(storage, "_dynamodb_resource", None)
+        storage.get_dynamodb_resource().create_table(
+            TableName=storage.TABLE_NAME,
+            KeySchema=key_schema("id"),
+            AttributeDefinitions=[{"AttributeName": name, "AttributeType": attribute_type} for name, attribute_type in
+                                  (("id", "S"), ("project", "S"), ("status", "S"), ("sync_partition", "S"), ("updated_at", "N"))],
+            GlobalSecondaryIndexes=[index(DynamoDBStorage.PROJECT_INDEX, "project"), index(DynamoDBStorage.STATUS_INDEX, "status"),
+                                    index(DynamoDBStorage.SYNC_INDEX, "sync_partition", "updated_at")],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield
+        monkeypatch.setattr(storage, "_dynamodb_resource", None)
+
+
+def test_dynamodb_round_trip(dynamodb_table):
+    # DynamoDB speichert Zahlen als Decimal
+    round_trip(DynamoDBStorage(scan_segments=2), make_item(exact_amount=Decimal("120.5")))